@@ -0,0 +1,99 @@
+import asyncio
+import os
+
+from starlette.responses import JSONResponse
+
+# Orçamentos de concorrência separados para escrita (ingestão) e leitura
+WRITE_MAX_CONCURRENCY = int(os.environ.get("WRITE_MAX_CONCURRENCY", 8))
+WRITE_MAX_QUEUE       = int(os.environ.get("WRITE_MAX_QUEUE", 64))
+READ_MAX_CONCURRENCY  = int(os.environ.get("READ_MAX_CONCURRENCY", 16))
+READ_MAX_QUEUE        = int(os.environ.get("READ_MAX_QUEUE", 128))
+ADMISSION_QUEUE_TIMEOUT_S = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_S", 5))
+RETRY_AFTER_S         = int(os.environ.get("ADMISSION_RETRY_AFTER_S", 1))
+
+
+class Budget:
+    """
+    Limite de requisições simultâneas com fila limitada. Quem não consegue vaga
+    espera na fila até `queue_timeout`; com a fila cheia (ou o tempo esgotado)
+    a requisição é rejeitada na hora, em vez de se acumular no threadpool.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._sem = None
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        if self._sem is None:
+            # criado dentro do event loop em execução
+            self._sem = asyncio.Semaphore(self.concurrency)
+        if self._sem.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            return False
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self.queued -= 1
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._sem.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "concurrency": self.concurrency, "max_queue": self.max_queue,
+            "active": self.active, "queued": self.queued, "rejected": self.rejected,
+        }
+
+
+write_budget = Budget("write", WRITE_MAX_CONCURRENCY, WRITE_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_S)
+read_budget = Budget("read", READ_MAX_CONCURRENCY, READ_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_S)
+
+
+def budget_for(method: str, path: str):
+    """Escritas em medições usam o orçamento de escrita; GETs da API o de leitura."""
+    if path.startswith("/buses") and "/measurements" in path and method in ("POST", "PUT", "DELETE"):
+        return write_budget
+    if method == "GET" and not path.startswith(("/docs", "/redoc", "/openapi.json", "/health", "/admission")):
+        return read_budget
+    return None
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI de controle de admissão: 429 + Retry-After quando o orçamento esgota."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        budget = budget_for(scope["method"], scope["path"])
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+        if not await budget.acquire():
+            response = JSONResponse(
+                {"detail": f"Server busy ({budget.name} capacity exhausted), retry later"},
+                status_code=429,
+                headers={"Retry-After": str(RETRY_AFTER_S)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            budget.release()
@@ -1,15 +1,71 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query, Path
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Path, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from datetime import datetime
-from models import Bus, Measurement, Setting
+from models import (
+    Bus, Measurement, Setting, DerivedMetrics, PQEvent, AlignedMeasurements,
+    DeleteResult, GapReport, ChannelSummary
+)
+from events import EVENT_KINDS
+from ringbuffer import RING_BUFFER_ENABLED, store as ring_store
+from singleflight import flight
+from admission import AdmissionMiddleware, read_budget, write_budget
+from resultcache import RESULT_CACHE_ENABLED, cache as result_cache
+from packed import PACKED_MEDIA_TYPE, decode as decode_packed
+from db import db_stats, get_db_conn, primary_pool
+from deadline import (
+    HEAVY_QUERY_TIMEOUT_MS, QUERY_TIMEOUT_MS, ClientDisconnected, current_scope, query_deadline
+)
+from psycopg2.extensions import QueryCanceledError
+from profiling import PROFILING_ENABLED, PROFILING_TOKEN, ProfilingMiddleware, authorized, span, store as profile_store
+from migrate import latest_version, migrate
 import crud
+import json
+
+# Estado de prontidão exposto em /health/ready
+readiness = {"schema_version": None, "schema_target": latest_version()}
+
+def _check_schema() -> int:
+    # migrate() é só uma consulta quando o esquema já está em dia
+    conn = get_db_conn()  # de quebra, aquece o pool
+    try:
+        readiness["schema_version"] = migrate(conn)
+    finally:
+        conn.close()
+    return readiness["schema_version"]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        version = await run_in_threadpool(_check_schema)
+        print(f"[migrate] schema verified at version {version}")
+    except Exception as e:
+        # /health/ready responde 503 e tenta de novo até o banco responder
+        print(f"[migrate] schema check failed: {e}")
+    if RING_BUFFER_ENABLED:
+        try:
+            await run_in_threadpool(ring_store.warm)
+            print("[ringbuffer] warmed from database")
+        except Exception as e:
+            # buffers frios são aquecidos sob demanda na primeira consulta
+            print(f"[ringbuffer] warm-up failed: {e}")
+    yield
 
 app = FastAPI(
     title="LabREI Microgrid API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Adicionado antes do CORS para que as respostas 429 também levem os cabeçalhos CORS
+# Mais interno: o perfil não inclui a espera na fila de admissão
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -18,10 +74,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(QueryCanceledError)
+@app.exception_handler(ClientDisconnected)
+async def query_cancelled_handler(request: Request, exc: Exception):
+    """statement_timeout estourado -> 504; cancelado porque o cliente desconectou -> 499."""
+    scope = getattr(request.state, "query_scope", None)
+    if isinstance(exc, ClientDisconnected) or (scope is not None and scope.cancelled):
+        return Response(status_code=499)
+    timeout = f" ({scope.timeout_ms} ms)" if scope is not None else ""
+    return JSONResponse({"detail": f"Query exceeded its deadline{timeout}"}, status_code=504)
+
+def _coalesced(fn, *args, cache_scope=None):
+    """
+    Executa uma consulta pesada do crud via single-flight: requisições idênticas
+    concorrentes (mesma função e parâmetros normalizados) compartilham a mesma
+    consulta ao banco e o mesmo corpo JSON já serializado.
+    `cache_scope=(bus_ids, start, end)` habilita o cache de resultados quando a
+    janela já está assentada (end mais antigo que RESULT_CACHE_SETTLE_S).
+    """
+    key = (fn.__name__,) + tuple(_normalize(a) for a in args)
+    cacheable = (
+        RESULT_CACHE_ENABLED and cache_scope is not None
+        and result_cache.cacheable(cache_scope[2])
+    )
+    if cacheable:
+        body = result_cache.get(key)
+        if body is not None:
+            return Response(body, media_type="application/json")
+        generation = result_cache.generation
+
+    scope = current_scope()
+
+    def run():
+        with span("crud"):
+            result = fn(*args)
+        if scope is not None:
+            scope.check()  # cliente(s) já foram embora: não serializa
+        with span("serialize"):
+            body = json.dumps(
+                jsonable_encoder(result), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+            ).encode("utf-8")
+        if cacheable:
+            result_cache.put(key, body, *cache_scope, generation=generation)
+        return body
+
+    return Response(flight.do(key, run, scope), media_type="application/json")
+
+def _normalize(value):
+    # mesmo instante em fusos/representações diferentes -> mesma chave
+    if isinstance(value, datetime):
+        return value.timestamp() if value.tzinfo else value.isoformat()
+    return value
+
+# Limite de linhas da grade do endpoint /buses/measurements/aligned
+MAX_ALIGNED_BUCKETS = 100_000
+
 # Namespaced routers
 bus_router = APIRouter(prefix="/buses", tags=["Buses"])
 measurement_router = APIRouter(prefix="/buses", tags=["Measurements"])
 settings_router = APIRouter(prefix="/settings", tags=["Settings"])
+event_router = APIRouter(prefix="/events", tags=["Events"])
+cache_router = APIRouter(prefix="/cache", tags=["Cache"])
 
 # ———— BUSES ————
 @bus_router.get("", response_model=List[Bus])
@@ -62,7 +175,37 @@ def change_bus(
     return True
 
 # ———— MEASUREMENTS ————
-@measurement_router.get("/{bus_id}/measurements", response_model=List[Measurement])
+@measurement_router.get(
+    "/measurements/aligned", response_model=AlignedMeasurements,
+    dependencies=[query_deadline(HEAVY_QUERY_TIMEOUT_MS)]
+)
+def read_aligned_measurements(
+    bus_ids: List[int] = Query(..., description="Bus numbers (repeat the parameter)"),
+    channels: List[str] = Query(["va_rms"], description="Channels (repeat the parameter)"),
+    start: datetime = Query(..., description="Start timestamp (ISO8601)"),
+    end:   datetime = Query(..., description="End timestamp (ISO8601, exclusive)"),
+    bucket_s: int = Query(60, ge=1, description="Bucket width in seconds"),
+    fill: str = Query("locf", description="Gap filling: none, locf or interpolate")
+):
+    """
+    One time grid for several buses, with one column per (bus, channel),
+    computed in a single gap-filled query.
+    """
+    invalid = [c for c in channels if c not in crud.MEASUREMENT_CHANNELS]
+    if invalid:
+        raise HTTPException(400, f"Invalid channels: {', '.join(invalid)}")
+    if fill not in ("none", "locf", "interpolate"):
+        raise HTTPException(400, f"Invalid fill '{fill}'")
+    if end <= start:
+        raise HTTPException(400, "end must be after start")
+    if (end - start).total_seconds() / bucket_s > MAX_ALIGNED_BUCKETS:
+        raise HTTPException(400, f"Too many buckets (max {MAX_ALIGNED_BUCKETS}); increase bucket_s")
+    return _coalesced(
+        crud.get_aligned_measurements, tuple(bus_ids), tuple(channels), start, end, bucket_s, fill,
+        cache_scope=(bus_ids, start, end)
+    )
+
+@measurement_router.get("/{bus_id}/measurements", response_model=List[Measurement], dependencies=[query_deadline(QUERY_TIMEOUT_MS)])
 def read_measurements(
     bus_id: int = Path(..., description="Bus number"),
     limit: int = Query(100, ge=1, le=10000, description="Max number of records")
@@ -70,7 +213,7 @@ def read_measurements(
     """Get the latest N measurements for a bus."""
     return crud.get_measurements(bus_id, limit)
 
-@measurement_router.get("/{bus_id}/measurements/last", response_model=Measurement)
+@measurement_router.get("/{bus_id}/measurements/last", response_model=Measurement, dependencies=[query_deadline(QUERY_TIMEOUT_MS)])
 def read_last_measurement(
     bus_id: int = Path(..., description="Bus number")
 ):
@@ -79,14 +222,20 @@ def read_last_measurement(
         raise HTTPException(404, "No measurements found for this bus")
     return m
 
-@measurement_router.get("/{bus_id}/measurements/range", response_model=List[Measurement])
+@measurement_router.get(
+    "/{bus_id}/measurements/range", response_model=List[Measurement],
+    dependencies=[query_deadline(HEAVY_QUERY_TIMEOUT_MS)]
+)
 def read_measurements_in_range(
     bus_id: int = Path(..., description="Bus number"),
     start: datetime = Query(..., description="Start timestamp (ISO8601)"),
     end:   datetime = Query(..., description="End timestamp (ISO8601)"),
     limit: int      = Query(100, ge=1, le=10000, description="Limit records returned")
 ):
-    return crud.get_measurements_in_range(bus_id, start, end, limit)
+    return _coalesced(
+        crud.get_measurements_in_range, bus_id, start, end, limit,
+        cache_scope=([bus_id], start, end)
+    )
 
 @measurement_router.post("/{bus_id}/measurements", response_model=dict, status_code=201)
 def add_measurement(
@@ -97,6 +246,39 @@ def add_measurement(
         raise HTTPException(400, "Path bus_id and payload bus_id must match")
     return crud.add_measurement(m)
 
+@measurement_router.post("/{bus_id}/measurements/bulk", response_model=dict, status_code=201)
+def add_measurements_bulk(
+    bus_id: int = Path(..., description="Bus number"),
+    ms: List[Measurement] = ...
+):
+    """Insert many measurements for a bus in a single transaction."""
+    if any(m.bus_id != bus_id for m in ms):
+        raise HTTPException(400, "Path bus_id and payload bus_id must match")
+    return {"inserted": crud.create_measurements(ms)}
+
+@measurement_router.post(
+    "/measurements/packed", response_model=dict, status_code=201,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        PACKED_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}
+    }}}
+)
+async def add_measurements_packed(request: Request):
+    """
+    Insert many measurements (any buses) from a packed columnar batch: header
+    "LRM1" + uint32 rows + uint16 channels + 2 pad bytes, then int32 bus_id[],
+    int64 epoch-µs timestamp[] and int32 channel columns, little-endian;
+    INT32_MIN means NULL. Written through the same path as /bulk.
+    """
+    if request.headers.get("content-type", "").split(";")[0].strip() != PACKED_MEDIA_TYPE:
+        raise HTTPException(415, f"Content-Type must be {PACKED_MEDIA_TYPE}")
+    body = await request.body()
+    # decodificar até PACKED_MAX_ROWS linhas no event loop travaria as demais requisições
+    try:
+        ms = await run_in_threadpool(decode_packed, body)
+    except ValueError as e:
+        raise HTTPException(400, f"Invalid packed payload: {e}")
+    return {"inserted": await run_in_threadpool(crud.create_measurements, ms)}
+
 @measurement_router.put(
     "/{bus_id}/measurements/{year}/{month}/{day}/{hour}/{minute}/{second}",
     response_model=bool
@@ -136,28 +318,33 @@ def remove_measurement(
         raise HTTPException(404, "Measurement not found to delete")
     return True
 
-@measurement_router.delete("/{bus_id}/measurements", response_model=int)
+@measurement_router.delete("/{bus_id}/measurements", response_model=DeleteResult)
 def remove_all_measurements(
     bus_id: int = Path(..., description="Bus number")
 ):
+    """Delete all measurements of a bus. Reports rows and whole chunks removed."""
     return crud.delete_all_measurements(bus_id)
 
-@measurement_router.delete("/{bus_id}/measurements/range", response_model=int)
+@measurement_router.delete("/{bus_id}/measurements/range", response_model=DeleteResult)
 def remove_measurements_in_range(
     bus_id: int = Path(..., description="Bus number"),
     start: datetime = Query(..., description="Start timestamp (ISO8601)"),
     end:   datetime = Query(..., description="End timestamp (ISO8601)")
 ):
+    """Delete measurements of a bus in [start, end]. Reports rows and whole chunks removed."""
     return crud.delete_measurements_in_range(bus_id, start, end)
 
-@measurement_router.get("/{bus_id}/measurements/lastn", response_model=List[Measurement])
+@measurement_router.get("/{bus_id}/measurements/lastn", response_model=List[Measurement], dependencies=[query_deadline(QUERY_TIMEOUT_MS)])
 def read_last_n_measurements(
     bus_id: int = Path(..., description="Bus number"),
     n: int = Query(10, ge=1, le=1000, description="Number of most recent measurements")
 ):
     return crud.get_last_n_measurements(bus_id, n)
 
-@measurement_router.get("/{bus_id}/measurements/lasthours", response_model=List[Measurement])
+@measurement_router.get(
+    "/{bus_id}/measurements/lasthours", response_model=List[Measurement],
+    dependencies=[query_deadline(HEAVY_QUERY_TIMEOUT_MS)]
+)
 def get_measurements_last_n_hours(
     bus_id: int = Path(..., description="Bus number"),
     hours: int = Query(24, ge=1, le=168, description="Quantidade de horas (até 7 dias = 168)")
@@ -165,10 +352,10 @@ def get_measurements_last_n_hours(
     """
     Retorna todas as medições das últimas N horas para o barramento informado.
     """
-    return crud.get_measurements_last_n_hours(bus_id, hours)
+    return _coalesced(crud.get_measurements_last_n_hours, bus_id, hours)
 
 
-@measurement_router.get("/{bus_id}/measurements/lastminutes", response_model=List[Measurement])
+@measurement_router.get("/{bus_id}/measurements/lastminutes", response_model=List[Measurement], dependencies=[query_deadline(QUERY_TIMEOUT_MS)])
 def get_measurements_last_n_minutes(
     bus_id: int = Path(..., description="Bus number"),
     minutes: int = Query(
@@ -182,6 +369,191 @@ def get_measurements_last_n_minutes(
     """
     return crud.get_measurements_last_n_minutes(bus_id, minutes)
 
+@measurement_router.get(
+    "/{bus_id}/measurements/derived", response_model=List[DerivedMetrics],
+    dependencies=[query_deadline(HEAVY_QUERY_TIMEOUT_MS)]
+)
+def read_derived_metrics(
+    bus_id: int = Path(..., description="Bus number"),
+    start: datetime = Query(..., description="Start timestamp (ISO8601)"),
+    end:   datetime = Query(..., description="End timestamp (ISO8601, exclusive)"),
+    bucket: str = Query("hour", description=f"Bucket width: {', '.join(crud.BUCKET_WIDTHS)}"),
+    tz: str = Query("UTC", description="Time zone used to align buckets (e.g. America/Sao_Paulo)"),
+    max_gap_s: float = Query(60.0, gt=0, description="Max seconds a sample is integrated over")
+):
+    """
+    Three-phase totals, unbalance, apparent power check and energy (kWh/kvarh)
+    per bucket, computed in the database.
+    """
+    if bucket not in crud.BUCKET_WIDTHS:
+        raise HTTPException(400, f"Invalid bucket '{bucket}'")
+    return _coalesced(
+        crud.get_derived_metrics, bus_id, start, end, bucket, tz, max_gap_s,
+        cache_scope=([bus_id], start, end)
+    )
+
+@measurement_router.get(
+    "/{bus_id}/measurements/gaps", response_model=GapReport,
+    dependencies=[query_deadline(HEAVY_QUERY_TIMEOUT_MS)]
+)
+def read_gap_report(
+    bus_id: int = Path(..., description="Bus number"),
+    start: datetime = Query(..., description="Start timestamp (ISO8601)"),
+    end:   datetime = Query(..., description="End timestamp (ISO8601, exclusive)"),
+    bucket: str = Query("hour", description=f"Bucket width: {', '.join(crud.BUCKET_WIDTHS)}"),
+    tz: str = Query("UTC", description="Time zone used to align buckets (e.g. America/Sao_Paulo)"),
+    cadence_s: Optional[float] = Query(None, gt=0, description="Expected sampling interval (default: observed median)"),
+    gap_factor: float = Query(3.0, gt=1, description="A gap is an interval longer than gap_factor x cadence"),
+    source: str = Query("auto", description="raw (exact), rollup (hourly aggregate) or auto"),
+    max_gaps: int = Query(1000, ge=1, le=100000, description="Limit gaps returned")
+):
+    """
+    Sampling-quality report: gaps between samples and per-bucket sample counts
+    against the expected cadence, computed in the database.
+    """
+    if bucket not in crud.BUCKET_WIDTHS:
+        raise HTTPException(400, f"Invalid bucket '{bucket}'")
+    if source not in ("auto", "raw", "rollup"):
+        raise HTTPException(400, f"Invalid source '{source}'")
+    if source == "rollup" and bucket not in ("hour", "day", "week"):
+        raise HTTPException(400, "The hourly rollup supports buckets of an hour or more")
+    return _coalesced(
+        crud.get_gap_report, bus_id, start, end, bucket, tz, cadence_s, gap_factor, source, max_gaps,
+        cache_scope=([bus_id], start, end)
+    )
+
+@measurement_router.get(
+    "/{bus_id}/measurements/summary", response_model=ChannelSummary,
+    dependencies=[query_deadline(HEAVY_QUERY_TIMEOUT_MS)]
+)
+def read_channel_summary(
+    bus_id: int = Path(..., description="Bus number"),
+    start: datetime = Query(..., description="Start timestamp (ISO8601)"),
+    end:   datetime = Query(..., description="End timestamp (ISO8601, exclusive)"),
+    channels: List[str] = Query(["va_rms"], description="Channels (repeat the parameter)"),
+    bucket: str = Query("day", description=f"Bucket width: {', '.join(crud.BUCKET_WIDTHS)}"),
+    tz: str = Query("UTC", description="Time zone used to align buckets (e.g. America/Sao_Paulo)"),
+    percentiles: Optional[str] = Query(None, description="Comma-separated quantiles in (0, 1), e.g. 0.05,0.5,0.95"),
+    bins: int = Query(0, ge=0, le=1000, description="Histogram bins per channel (0 = no histogram)"),
+    hist_min: Optional[float] = Query(None, description="Histogram lower edge (default: channel minimum in range)"),
+    hist_max: Optional[float] = Query(None, description="Histogram upper edge (default: channel maximum in range)"),
+    source: str = Query("auto", description="raw (exact), rollup (hourly aggregate, moments only) or auto")
+):
+    """
+    Per-channel statistics per bucket (count, min, max, mean, stddev and,
+    from raw samples, percentiles and fixed-edge histograms), computed in the
+    database. Without percentiles or histograms, buckets of an hour or more
+    are answered from the hourly rollup.
+    """
+    invalid = [c for c in channels if c not in crud.MEASUREMENT_CHANNELS]
+    if invalid:
+        raise HTTPException(400, f"Invalid channels: {', '.join(invalid)}")
+    if bucket not in crud.BUCKET_WIDTHS:
+        raise HTTPException(400, f"Invalid bucket '{bucket}'")
+    if source not in ("auto", "raw", "rollup"):
+        raise HTTPException(400, f"Invalid source '{source}'")
+    try:
+        quantiles = tuple(float(q) for q in percentiles.split(",")) if percentiles else ()
+    except ValueError:
+        raise HTTPException(400, f"Invalid percentiles '{percentiles}'")
+    if any(not 0 < q < 1 for q in quantiles):
+        raise HTTPException(400, "Percentiles must be between 0 and 1")
+    if (hist_min is None) != (hist_max is None) or (hist_min is not None and hist_max <= hist_min):
+        raise HTTPException(400, "hist_min and hist_max must be given together, with hist_min < hist_max")
+    if source == "rollup" and (quantiles or bins or bucket not in ("hour", "day", "week")):
+        raise HTTPException(
+            400, "The hourly rollup only has count/min/max/mean/stddev for buckets of an hour or more"
+        )
+    if end <= start:
+        raise HTTPException(400, "end must be after start")
+    return _coalesced(
+        crud.get_channel_summary, bus_id, start, end, bucket, tz, tuple(channels), quantiles, bins,
+        hist_min, hist_max, source,
+        cache_scope=([bus_id], start, end)
+    )
+
+
+# ———— EVENTS ————
+@event_router.get("", response_model=List[PQEvent], dependencies=[query_deadline(QUERY_TIMEOUT_MS)])
+def read_events(
+    start: datetime = Query(..., description="Start timestamp (ISO8601)"),
+    end:   datetime = Query(..., description="End timestamp (ISO8601)"),
+    bus_id: Optional[int] = Query(None, description="Bus number (default: all buses)"),
+    kind: Optional[str] = Query(None, description=f"Event kind: {', '.join(EVENT_KINDS)}"),
+    limit: int = Query(1000, ge=1, le=10000, description="Limit records returned")
+):
+    """Power-quality events (sag, swell, overcurrent, frequency, low PF) overlapping [start, end]."""
+    if kind is not None and kind not in EVENT_KINDS:
+        raise HTTPException(400, f"Invalid event kind '{kind}'")
+    return crud.get_events(start, end, bus_id, kind, limit)
+
+
+# ———— CACHE ————
+@cache_router.get("/stats", response_model=dict)
+def read_cache_stats():
+    """Hit/miss counters and sizes of the historical result cache."""
+    return result_cache.snapshot()
+
+@cache_router.post("/invalidate", response_model=dict)
+def invalidate_cache(
+    bus_id: int = Query(..., description="Bus number"),
+    start: Optional[datetime] = Query(None, description="Start timestamp (ISO8601, default: open)"),
+    end:   Optional[datetime] = Query(None, description="End timestamp (ISO8601, default: open)")
+):
+    """Drop cached results overlapping a window (for loaders writing straight to the database)."""
+    ring_store.invalidate(bus_id)
+    return {"invalidated": result_cache.invalidate(bus_id, start, end)}
+
+
+# ———— ADMISSION ————
+@app.get("/admission/stats", response_model=dict, tags=["Admission"])
+def read_admission_stats():
+    """Active, queued and rejected requests per concurrency budget (read / write), plus group-commit counters."""
+    return {
+        "read": read_budget.snapshot(),
+        "write": write_budget.snapshot(),
+        "write_queue": {"enabled": crud.WRITE_QUEUE_ENABLED, **crud.write_queue.stats},
+    }
+
+
+def _require_profiling(request: Request):
+    if not authorized(request.headers):
+        raise HTTPException(404 if not (PROFILING_ENABLED and PROFILING_TOKEN) else 403, "Profiling not available")
+
+@app.get("/profiles", response_model=List[dict], tags=["Profiling"])
+def list_profiles(request: Request):
+    """Recent request profiles (phase timings in ms). Requires PROFILING_ENABLED, PROFILING_TOKEN and a matching X-Profile-Token."""
+    _require_profiling(request)
+    return profile_store.list()
+
+@app.get("/profiles/{profile_id}", tags=["Profiling"])
+def read_profile(request: Request, profile_id: str, format: str = Query("folded", description="folded or json")):
+    """Sampled stacks of a profiled request in folded format (flamegraph.pl, speedscope), or its summary."""
+    _require_profiling(request)
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(404, f"Profile {profile_id} not found")
+    if format == "json":
+        return profile.summary()
+    return Response(profile.folded(), media_type="text/plain")
+
+@app.get("/health/ready", response_model=dict, tags=["Database"])
+def read_readiness():
+    """Ready once the connection pool is warm and the schema is at the latest migration (503 otherwise)."""
+    if readiness["schema_version"] != readiness["schema_target"]:
+        try:
+            _check_schema()
+        except Exception as e:
+            return JSONResponse({"ready": False, "detail": str(e), **readiness}, status_code=503)
+    ready = primary_pool.warm and readiness["schema_version"] == readiness["schema_target"]
+    body = {"ready": ready, "pool_warm": primary_pool.warm, **readiness}
+    return body if ready else JSONResponse(body, status_code=503)
+
+@app.get("/db/stats", response_model=dict, tags=["Database"])
+def read_db_stats():
+    """Connection pool usage and read-replica health (lag, replica reads, primary fallbacks)."""
+    return db_stats()
+
 
 # ———— SETTINGS ————
 @settings_router.get("/all", response_model=List[Setting])
@@ -205,3 +577,5 @@ def update_setting(key: str, value: str):
 app.include_router(bus_router)
 app.include_router(measurement_router)
 app.include_router(settings_router)
+app.include_router(event_router)
+app.include_router(cache_router)
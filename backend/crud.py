@@ -1,8 +1,21 @@
-from db import get_db_conn
+from db import get_db_conn, get_read_conn
 from models import Bus, Measurement
+from events import detector
+from ringbuffer import RING_BUFFER_ENABLED, store as ring_store
+from resultcache import cache as result_cache
+from writequeue import WRITE_QUEUE_ENABLED, WRITE_QUEUE_MAX_BATCH, WRITE_QUEUE_MAX_DELAY_MS, WriteQueue
+import math
+import os
+import threading
 import psycopg2.extras
-from datetime import datetime
-from datetime import datetime, timedelta
+from psycopg2 import sql
+from typing import Dict, List
+from datetime import datetime, timedelta, timezone
+
+# Ordem das colunas de measurements (mesma ordem dos campos de Measurement)
+MEASUREMENT_COLUMNS = tuple(Measurement.model_fields.keys())
+# Canais numéricos (todas as colunas exceto a PK)
+MEASUREMENT_CHANNELS = MEASUREMENT_COLUMNS[2:]
 
 
 # ————— BUSES —————
@@ -32,6 +45,7 @@ def create_bus(bus: Bus):
         new_id = cur.fetchone()[0]
     conn.commit()
     conn.close()
+    detector.invalidate(bus.bus_number)
     return new_id
 
 def get_bus_by_name(name: str):
@@ -84,6 +98,7 @@ def update_bus(bus_number: int, bus: Bus) -> bool:
         updated = cur.rowcount > 0
     conn.commit()
     conn.close()
+    detector.invalidate(bus_number)
     return updated
 
 
@@ -93,15 +108,70 @@ def get_measurements(bus_id: int, limit: int = 100):
     """Consultar as últimas N medições de um barramento."""
     conn = get_db_conn()
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+        rows = _fetch_latest(cur, bus_id, limit)
+    conn.close()
+    return [dict(r) for r in rows]
+
+# Busca adaptativa das N últimas medições: começa numa janela recente e alarga
+# geometricamente até achar N linhas ou passar do chunk mais antigo, para que
+# o planner só toque os chunks recentes em vez de todos (inclusive comprimidos).
+LASTN_INITIAL_WINDOW_S = float(os.environ.get("LASTN_INITIAL_WINDOW_S", 300))
+LASTN_GROWTH = float(os.environ.get("LASTN_GROWTH", 8))
+
+_latest_lock = threading.Lock()
+_latest_ts: Dict[int, datetime] = {}   # último timestamp conhecido por barramento
+_cadence_s: Dict[int, float] = {}      # intervalo médio observado entre amostras
+
+def _note_latest(bus_id: int, ts: datetime):
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    with _latest_lock:
+        cur = _latest_ts.get(bus_id)
+        if cur is None or ts > cur:
+            _latest_ts[bus_id] = ts
+
+def _forget_latest(bus_id: int):
+    with _latest_lock:
+        _latest_ts.pop(bus_id, None)
+
+def _fetch_latest(cur, bus_id: int, n: int):
+    """Até N linhas mais recentes do barramento, em ordem decrescente de timestamp."""
+    with _latest_lock:
+        anchor = _latest_ts.get(bus_id)
+        cadence = _cadence_s.get(bus_id)
+    if anchor is None:
+        anchor = datetime.now(timezone.utc)
+    window = max(LASTN_INITIAL_WINDOW_S, 2 * n * cadence if cadence else 0)
+    oldest = None
+    while True:
+        since = anchor - timedelta(seconds=window)
+        # sem limite superior: linhas mais novas que o anchor também entram
         cur.execute("""
             SELECT * FROM measurements
              WHERE bus_id = %s
+               AND timestamp > %s
              ORDER BY timestamp DESC
              LIMIT %s;
-        """, (bus_id, limit))
+        """, (bus_id, since, n))
         rows = cur.fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+        if len(rows) >= n:
+            break
+        if oldest is None:
+            cur.execute("""
+                SELECT min(range_start) FROM timescaledb_information.chunks
+                 WHERE hypertable_name = 'measurements';
+            """)
+            oldest = cur.fetchone()[0]
+        if oldest is None or since <= oldest:
+            break
+        window *= LASTN_GROWTH
+    if rows:
+        _note_latest(bus_id, rows[0]["timestamp"])
+        if len(rows) > 1:
+            span = (rows[0]["timestamp"] - rows[-1]["timestamp"]).total_seconds()
+            with _latest_lock:
+                _cadence_s[bus_id] = span / (len(rows) - 1) or None
+    return rows
 
 def add_measurement(m: Measurement):
     """Adicionar uma medida para um barramento."""
@@ -109,6 +179,10 @@ def add_measurement(m: Measurement):
 
 def create_measurement(m: Measurement):
     """Interno: insere um registro de medições."""
+    if WRITE_QUEUE_ENABLED:
+        # group commit: retorna após o commit do lote (os ganchos rodam no escritor)
+        write_queue.submit(m)
+        return {"bus_id": m.bus_id, "timestamp": m.timestamp}
     conn = get_db_conn()
     with conn.cursor() as cur:
         cur.execute("""
@@ -146,9 +220,55 @@ def create_measurement(m: Measurement):
         ))
     conn.commit()
     conn.close()
+    _after_insert([m])
     # retornamos o par natural de PK
     return {"bus_id": m.bus_id, "timestamp": m.timestamp}
 
+def create_measurements(ms: List[Measurement]) -> int:
+    """
+    Insere várias medições em uma única transação (um INSERT multi-linha).
+    Retorna o número de linhas inseridas.
+    """
+    if not ms:
+        return 0
+    conn = get_db_conn()
+    with conn.cursor() as cur:
+        _insert_rows(cur, ms)
+    conn.commit()
+    conn.close()
+    _after_insert(ms)
+    return len(ms)
+
+def _insert_rows(cur, ms: List[Measurement]):
+    psycopg2.extras.execute_values(
+        cur,
+        f"INSERT INTO measurements ({', '.join(MEASUREMENT_COLUMNS)}) VALUES %s;",
+        [tuple(getattr(m, c) for c in MEASUREMENT_COLUMNS) for m in ms],
+        page_size=1000
+    )
+
+def _after_insert(ms: List[Measurement]):
+    """Ganchos executados após o commit de novas medições."""
+    for m in ms:
+        _note_latest(m.bus_id, m.timestamp)
+    if RING_BUFFER_ENABLED:
+        ring_store.append(ms)
+    # backfill de janelas já assentadas invalida resultados em cache
+    settled = {}
+    for m in ms:
+        if result_cache.cacheable(m.timestamp):
+            lo, hi = settled.get(m.bus_id, (m.timestamp, m.timestamp))
+            settled[m.bus_id] = (min(lo, m.timestamp), max(hi, m.timestamp))
+    for bus_id, (lo, hi) in settled.items():
+        result_cache.invalidate(bus_id, lo, hi)
+    try:
+        detector.observe(ms)
+    except Exception as e:
+        # a detecção de eventos nunca deve derrubar a ingestão
+        print(f"[events] detection failed: {e}")
+
+write_queue = WriteQueue(_insert_rows, _after_insert, WRITE_QUEUE_MAX_BATCH, WRITE_QUEUE_MAX_DELAY_MS)
+
 def update_measurement(
     bus_id: int,
     year: int, month: int, day: int, hour: int, minute: int, second: int,
@@ -192,6 +312,8 @@ def update_measurement(
         updated = cur.rowcount > 0
     conn.commit()
     conn.close()
+    ring_store.invalidate(bus_id)
+    result_cache.invalidate(bus_id, ts, ts)
     return updated
 
 def delete_measurement(
@@ -211,52 +333,121 @@ def delete_measurement(
         deleted = cur.rowcount > 0
     conn.commit()
     conn.close()
+    ring_store.invalidate(bus_id)
+    result_cache.invalidate(bus_id, ts, ts)
     return deleted
 
 def delete_measurements_in_range(
     bus_id: int,
     start: datetime,  # ou (yr,mo,da,hr,mi,se) mas recebe datetime
     end: datetime
-) -> int:
+) -> dict:
     """
     Excluir medidas de um barramento em um intervalo [start, end].
-    Retorna número de linhas deletadas.
+    Retorna {"rows_deleted", "chunks_dropped"}.
     """
+    return _delete_measurements_chunked(bus_id, start, end)
+
+def delete_all_measurements(bus_id: int) -> dict:
+    """Excluir todas as medidas de um barramento. Retorna {"rows_deleted", "chunks_dropped"}."""
+    return _delete_measurements_chunked(bus_id, None, None)
+
+def _delete_measurements_chunked(bus_id: int, start: datetime = None, end: datetime = None) -> dict:
+    """
+    Exclusão ciente de chunks. Chunks inteiramente cobertos por [start, end] que
+    só contêm linhas deste barramento são removidos com drop_chunks (sem
+    descompressão nem tuplas mortas); o DELETE por linha fica restrito ao que
+    sobra: chunks das bordas e chunks compartilhados com outros barramentos.
+    Tudo em uma transação.
+    """
+    bounds = {
+        "start": start if start is not None else "-infinity",
+        "end": end if end is not None else "infinity",
+    }
     conn = get_db_conn()
+    rows_deleted = 0
+    chunks_dropped = 0
     with conn.cursor() as cur:
+        cur.execute("""
+            SELECT format('%%I.%%I', chunk_schema, chunk_name), range_start, range_end
+              FROM timescaledb_information.chunks
+             WHERE hypertable_name = 'measurements'
+               AND range_start >= %(start)s::timestamptz
+               AND range_end   <= %(end)s::timestamptz
+             ORDER BY range_start;
+        """, bounds)
+        covered = cur.fetchall()
+        dropped = []
+        for chunk, range_start, range_end in covered:
+            chunk_ident = sql.SQL(chunk)  # já citado por format('%I.%I')
+            cur.execute(
+                sql.SQL("SELECT EXISTS (SELECT 1 FROM {} WHERE bus_id <> %s);").format(chunk_ident),
+                (bus_id,)
+            )
+            if cur.fetchone()[0]:
+                continue
+            cur.execute(sql.SQL("SELECT count(*) FROM {};").format(chunk_ident))
+            rows_deleted += cur.fetchone()[0]
+            cur.execute("""
+                SELECT drop_chunks('measurements', older_than => %s, newer_than => %s);
+            """, (range_end, range_start))
+            chunks_dropped += len(cur.fetchall())
+            dropped.append((range_start, range_end))
         cur.execute("""
             DELETE FROM measurements
-             WHERE bus_id = %s
-               AND timestamp BETWEEN %s AND %s;
-        """, (bus_id, start, end))
-        count = cur.rowcount
+             WHERE bus_id = %(bus_id)s
+               AND timestamp BETWEEN %(start)s::timestamptz AND %(end)s::timestamptz;
+        """, {"bus_id": bus_id, **bounds})
+        rows_deleted += cur.rowcount
     conn.commit()
     conn.close()
-    return count
+    if dropped:
+        try:
+            refresh_rollups(dropped[0][0], dropped[-1][1])
+        except Exception as e:
+            # a exclusão já foi confirmada; o rollup fica defasado até um refresh manual
+            print(f"[rollup] refresh after drop_chunks failed: {e}")
+    _forget_latest(bus_id)
+    ring_store.invalidate(bus_id)
+    result_cache.invalidate(bus_id, start, end)
+    return {"rows_deleted": rows_deleted, "chunks_dropped": chunks_dropped}
 
-def delete_all_measurements(bus_id: int) -> int:
-    """Excluir todas as medidas de um barramento. Retorna quantas foram removidas."""
+def refresh_rollups(start: datetime, end: datetime):
+    """
+    Rematerializa os agregados contínuos de measurements em [start, end).
+    drop_chunks não registra invalidação nos agregados (DELETE por linha
+    registra, e a política os corrige), então sem isto os rollups continuariam
+    contando amostras de chunks removidos. Só para exclusões pedidas pelo
+    usuário: a retenção não chama isto, e o rollup guarda o histórico além dela.
+    """
     conn = get_db_conn()
-    with conn.cursor() as cur:
-        cur.execute("DELETE FROM measurements WHERE bus_id = %s;", (bus_id,))
-        count = cur.rowcount
-    conn.commit()
-    conn.close()
-    return count
+    try:
+        conn.autocommit = True  # refresh_continuous_aggregate não roda em transação
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT format('%I.%I', view_schema, view_name)
+                  FROM timescaledb_information.continuous_aggregates
+                 WHERE hypertable_name = 'measurements';
+            """)
+            for (view,) in cur.fetchall():
+                cur.execute(
+                    "CALL refresh_continuous_aggregate(%s::regclass, %s::timestamptz, %s::timestamptz);",
+                    (view, start, end)
+                )
+    finally:
+        conn.close()
 
 def get_last_measurement(bus_id: int):
     """Consultar a última medida de um barramento."""
+    if RING_BUFFER_ENABLED:
+        rows = ring_store.last_n(bus_id, 1)
+        if rows:
+            return rows[0]
     conn = get_db_conn()
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-        cur.execute("""
-            SELECT * FROM measurements
-             WHERE bus_id = %s
-             ORDER BY timestamp DESC
-             LIMIT 1;
-        """, (bus_id,))
-        row = cur.fetchone()
+        rows = _fetch_latest(cur, bus_id, 1)
     conn.close()
-    return dict(row) if row else None
+    return dict(rows[0]) if rows else None
 
 def get_measurements_in_range(
     bus_id: int,
@@ -268,7 +459,7 @@ def get_measurements_in_range(
     Consultar uma faixa de medidas de um barramento no intervalo [start, end].
     Retorna até `limit` registros ordenados por timestamp.
     """
-    conn = get_db_conn()
+    conn = get_read_conn()
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
         cur.execute("""
             SELECT * FROM measurements
@@ -285,18 +476,462 @@ def get_last_n_measurements(bus_id: int, n: int = 100):
     """
     Retorna as N últimas medições de um barramento, ordenadas do mais antigo para o mais recente.
     """
+    if RING_BUFFER_ENABLED:
+        rows = ring_store.last_n(bus_id, n)
+        if rows is not None:
+            return rows
     conn = get_db_conn()
+    with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+        rows = _fetch_latest(cur, bus_id, n)
+    conn.close()
+    # Inverte a ordem para retornar do mais antigo para o mais recente
+    return [dict(r) for r in reversed(rows)]
+
+
+# Larguras de bucket aceitas pelos relatórios agregados
+BUCKET_WIDTHS = {
+    "1min": "1 minute",
+    "15min": "15 minutes",
+    "hour": "1 hour",
+    "day": "1 day",
+    "week": "7 days",
+}
+BUCKET_S = {"1min": 60, "15min": 900, "hour": 3600, "day": 86400, "week": 604800}
+
+def get_derived_metrics(
+    bus_id: int,
+    start: datetime,
+    end: datetime,
+    bucket: str = "hour",
+    tz: str = "UTC",
+    max_gap_s: float = 60.0
+):
+    """
+    Grandezas derivadas por bucket, calculadas no banco a partir das fases:
+    totais trifásicos de P/Q/S, desequilíbrio de tensão/corrente (máximo desvio
+    da média, em %), discrepância entre S medido e sqrt(P²+Q²) e energia
+    (kWh/kvarh) integrada por retângulos. O passo de integração de cada amostra
+    é limitado a `max_gap_s` para não integrar através de falhas de coleta.
+    Considera potências em W/var/VA.
+    """
+    conn = get_read_conn()
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
         cur.execute("""
-            SELECT * FROM measurements
-             WHERE bus_id = %s
-             ORDER BY timestamp DESC
+            WITH s AS (
+                SELECT timestamp,
+                       (pa + pb + pc)::float8 AS p_total,
+                       (qa + qb + qc)::float8 AS q_total,
+                       (sa + sb + sc)::float8 AS s_total,
+                       (va_rms + vb_rms + vc_rms) / 3.0 AS v_avg,
+                       GREATEST(abs(va_rms - (va_rms + vb_rms + vc_rms) / 3.0),
+                                abs(vb_rms - (va_rms + vb_rms + vc_rms) / 3.0),
+                                abs(vc_rms - (va_rms + vb_rms + vc_rms) / 3.0)) AS v_dev,
+                       (ia_rms + ib_rms + ic_rms) / 3.0 AS i_avg,
+                       GREATEST(abs(ia_rms - (ia_rms + ib_rms + ic_rms) / 3.0),
+                                abs(ib_rms - (ia_rms + ib_rms + ic_rms) / 3.0),
+                                abs(ic_rms - (ia_rms + ib_rms + ic_rms) / 3.0)) AS i_dev,
+                       COALESCE(LEAST(
+                           EXTRACT(EPOCH FROM LEAD(timestamp) OVER (ORDER BY timestamp) - timestamp),
+                           %(max_gap)s
+                       ), 0) AS dt
+                  FROM measurements
+                 WHERE bus_id = %(bus_id)s
+                   AND timestamp >= %(start)s AND timestamp < %(end)s
+            )
+            SELECT time_bucket(%(width)s::interval, timestamp, %(tz)s) AS bucket,
+                   count(*)                                        AS samples,
+                   avg(p_total)                                    AS p_total_avg,
+                   max(p_total)                                    AS p_total_max,
+                   avg(q_total)                                    AS q_total_avg,
+                   avg(s_total)                                    AS s_total_avg,
+                   sum(p_total) / NULLIF(sum(s_total), 0)          AS pf_total,
+                   sum(p_total * dt) / 3600000.0                   AS energy_kwh,
+                   sum(q_total * dt) / 3600000.0                   AS energy_kvarh,
+                   avg(100.0 * v_dev / NULLIF(v_avg, 0))           AS voltage_unbalance_avg,
+                   max(100.0 * v_dev / NULLIF(v_avg, 0))           AS voltage_unbalance_max,
+                   avg(100.0 * i_dev / NULLIF(i_avg, 0))           AS current_unbalance_avg,
+                   max(100.0 * i_dev / NULLIF(i_avg, 0))           AS current_unbalance_max,
+                   avg(100.0 * abs(sqrt(p_total ^ 2 + q_total ^ 2) - s_total)
+                       / NULLIF(s_total, 0))                       AS apparent_power_mismatch_avg
+              FROM s
+             GROUP BY bucket
+             ORDER BY bucket;
+        """, {
+            "bus_id": bus_id, "start": start, "end": end,
+            "width": BUCKET_WIDTHS[bucket], "tz": tz, "max_gap": max_gap_s
+        })
+        rows = cur.fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+def get_aligned_measurements(
+    bus_ids: List[int],
+    channels: List[str],
+    start: datetime,
+    end: datetime,
+    bucket_s: int,
+    fill: str = "locf"
+):
+    """
+    Grade temporal única para vários barramentos em uma só consulta:
+    time_bucket_gapfill em [start, end) agrupado por barramento, com buckets
+    sem dados preenchidos com locf (último valor), interpolate (linear) ou
+    nulos (fill="none"); a consulta externa pivota uma coluna por
+    (barramento, canal). O preenchimento precisa ser por barramento: num
+    bucket em que só outro barramento tem dados a linha existe, e o
+    locf/interpolate de um GROUP BY só por bucket não a preencheria.
+    """
+    wrap = {
+        "none": lambda e: e,
+        "locf": lambda e: sql.SQL("locf({})").format(e),
+        "interpolate": lambda e: sql.SQL("interpolate({})").format(e),
+    }[fill]
+    columns = [(b, c) for b in bus_ids for c in channels]
+    filled = [
+        sql.SQL("{} AS {}").format(
+            wrap(sql.SQL("avg({})::float8").format(sql.Identifier(c))), sql.Identifier(c)
+        )
+        for c in channels
+    ]
+    select = [
+        sql.SQL("max({}) FILTER (WHERE bus_id = {})").format(sql.Identifier(c), sql.Literal(b))
+        for b, c in columns
+    ]
+    query = sql.SQL("""
+        SELECT bucket, {}
+          FROM (
+                SELECT time_bucket_gapfill(%(width)s::interval, timestamp, %(start)s, %(end)s) AS bucket,
+                       bus_id, {}
+                  FROM measurements
+                 WHERE bus_id = ANY(%(bus_ids)s)
+                   AND timestamp >= %(start)s AND timestamp < %(end)s
+                 GROUP BY bucket, bus_id
+               ) filled
+         GROUP BY bucket
+         ORDER BY bucket;
+    """).format(sql.SQL(", ").join(select), sql.SQL(", ").join(filled))
+    conn = get_read_conn()
+    with conn.cursor() as cur:
+        cur.execute(query, {
+            "width": f"{bucket_s} seconds", "start": start, "end": end, "bus_ids": list(bus_ids)
+        })
+        rows = cur.fetchall()
+    conn.close()
+    return {
+        "time": [r[0] for r in rows],
+        "columns": [
+            {"bus_id": b, "channel": c, "values": [r[i + 1] for r in rows]}
+            for i, (b, c) in enumerate(columns)
+        ],
+    }
+
+
+# Relatórios de falhas de coleta com mais de ROLLUP_MIN_RANGE usam o rollup horário
+ROLLUP_MIN_RANGE = timedelta(days=7)
+
+def get_gap_report(
+    bus_id: int,
+    start: datetime,
+    end: datetime,
+    bucket: str = "hour",
+    tz: str = "UTC",
+    cadence_s: float = None,
+    gap_factor: float = 3.0,
+    source: str = "auto",
+    max_gaps: int = 1000
+):
+    """
+    Qualidade da amostragem de um barramento em [start, end): falhas (intervalos
+    entre amostras maiores que `gap_factor` × cadência) e contagem de amostras
+    por bucket, comparada com o esperado. Sem `cadence_s`, a cadência é a mediana
+    dos intervalos observados.
+    source="raw" usa LAG sobre os timestamps brutos: exato, mas percorre todas
+    as amostras. source="rollup" lê o agregado horário measurements_samples_1h.
+    Ele é rápido para meses de dados, mas só vê as falhas que cruzam a fronteira
+    de uma hora; falhas dentro da hora aparecem apenas como completude menor no
+    bucket. source="auto" escolhe rollup para buckets de hora ou mais em faixas
+    acima de ROLLUP_MIN_RANGE.
+    """
+    start = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+    end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+    if source == "auto":
+        source = "rollup" if bucket in ("hour", "day", "week") and end - start > ROLLUP_MIN_RANGE else "raw"
+    params = {
+        "bus_id": bus_id, "start": start, "end": end, "width": BUCKET_WIDTHS[bucket], "tz": tz,
+        "cadence": cadence_s, "k": gap_factor, "max_gaps": max_gaps,
+    }
+    conn = get_read_conn()
+    with conn.cursor() as cur:
+        if source == "raw":
+            cur.execute("""
+                WITH s AS MATERIALIZED (
+                    SELECT timestamp AS ts,
+                           LAG(timestamp) OVER (ORDER BY timestamp) AS prev
+                      FROM measurements
+                     WHERE bus_id = %(bus_id)s
+                       AND timestamp >= %(start)s AND timestamp < %(end)s
+                ),
+                stats AS (
+                    SELECT count(*) AS samples, min(ts) AS first_ts, max(ts) AS last_ts,
+                           COALESCE(%(cadence)s::float8, percentile_cont(0.5) WITHIN GROUP (
+                               ORDER BY EXTRACT(EPOCH FROM ts - prev))) AS cadence
+                      FROM s
+                )
+                SELECT stats.samples, stats.first_ts, stats.last_ts, stats.cadence, g.prev, g.ts
+                  FROM stats
+                  LEFT JOIN LATERAL (
+                      SELECT prev, ts FROM s
+                       WHERE ts - prev > make_interval(secs => stats.cadence * %(k)s)
+                       ORDER BY ts
+                       LIMIT %(max_gaps)s + 1
+                  ) g ON TRUE;
+            """, params)
+            rows = cur.fetchall()
+            samples, first_ts, last_ts, cadence = rows[0][:4]
+            gaps = [(r[4], r[5]) for r in rows if r[4] is not None]
+        else:
+            cur.execute("""
+                SELECT samples, first_ts, last_ts
+                  FROM measurements_samples_1h
+                 WHERE bus_id = %(bus_id)s
+                   AND bucket >= time_bucket(INTERVAL '1 hour', %(start)s::timestamptz)
+                   AND bucket < %(end)s
+                 ORDER BY bucket;
+            """, params)
+            hours = cur.fetchall()
+            samples = sum(h[0] for h in hours)
+            first_ts = hours[0][1] if hours else None
+            last_ts = hours[-1][2] if hours else None
+            cadence = cadence_s
+            if cadence is None:
+                spans = sorted((h[2] - h[1]).total_seconds() / (h[0] - 1) for h in hours if h[0] > 1)
+                cadence = spans[len(spans) // 2] if spans else None
+            gaps = []
+            if cadence is not None:
+                gaps = [
+                    (a[2], b[1]) for a, b in zip(hours, hours[1:])
+                    if (b[1] - a[2]).total_seconds() > cadence * gap_factor
+                ][:max_gaps + 1]
+
+        bucket_table = "measurements" if source == "raw" else "measurements_samples_1h"
+        bucket_time = "timestamp" if source == "raw" else "bucket"
+        bucket_count = "count(*)" if source == "raw" else "sum(samples)"
+        cur.execute(sql.SQL("""
+            SELECT time_bucket_gapfill(%(width)s::interval, {time}, %(tz)s, %(start)s, %(end)s) AS bucket,
+                   COALESCE({count}, 0)::bigint AS samples
+              FROM {table}
+             WHERE bus_id = %(bus_id)s
+               AND {time} >= %(start)s AND {time} < %(end)s
+             GROUP BY 1
+             ORDER BY 1;
+        """).format(
+            time=sql.Identifier(bucket_time), count=sql.SQL(bucket_count), table=sql.Identifier(bucket_table)
+        ), params)
+        bucket_rows = cur.fetchall()
+    conn.close()
+
+    # falhas nas bordas: antes da primeira amostra e após a última (até agora)
+    threshold = cadence * gap_factor if cadence else None
+    horizon = min(end, datetime.now(timezone.utc))
+    if first_ts is None:
+        gaps = [(start, horizon)] if horizon > start else []
+    elif threshold is not None:
+        if (first_ts - start).total_seconds() > threshold:
+            gaps.insert(0, (start, first_ts))
+        if (horizon - last_ts).total_seconds() > threshold:
+            gaps.append((last_ts, horizon))
+    truncated = len(gaps) > max_gaps
+
+    width_s = BUCKET_S[bucket]
+    buckets = []
+    for b, n in bucket_rows:
+        covered = (min(b + timedelta(seconds=width_s), horizon) - max(b, start)).total_seconds()
+        expected = covered / cadence if cadence and covered > 0 else None
+        buckets.append({
+            "bucket": b, "samples": n,
+            "expected": round(expected, 1) if expected else None,
+            "completeness": round(n / expected, 4) if expected else None,
+        })
+    span_s = max(0.0, (horizon - start).total_seconds())
+    expected_total = span_s / cadence if cadence and span_s else None
+    return {
+        "bus_id": bus_id, "start": start, "end": end, "source": source,
+        "cadence_s": cadence, "gap_threshold_s": threshold,
+        "samples": samples,
+        "expected_samples": round(expected_total, 1) if expected_total else None,
+        "completeness": round(samples / expected_total, 4) if expected_total else None,
+        "gaps": [
+            {
+                "start": a, "end": b, "duration_s": (b - a).total_seconds(),
+                "missing_samples": max(0, round((b - a).total_seconds() / cadence) - 1) if cadence else None,
+            }
+            for a, b in gaps[:max_gaps]
+        ],
+        "gaps_truncated": truncated,
+        "buckets": buckets,
+    }
+
+
+def _percentile_key(q: float) -> str:
+    return f"p{round(q * 100, 3):g}"
+
+def get_channel_summary(
+    bus_id: int,
+    start: datetime,
+    end: datetime,
+    bucket: str = "day",
+    tz: str = "UTC",
+    channels: List[str] = ("va_rms",),
+    percentiles: List[float] = (),
+    bins: int = 0,
+    hist_min: float = None,
+    hist_max: float = None,
+    source: str = "auto"
+):
+    """
+    Estatísticas por canal e por bucket calculadas no banco: count, min, max,
+    média, desvio padrão (amostral), percentis (percentile_cont) e histograma
+    de `bins` faixas fixas (histogram() do TimescaleDB, via width_bucket).
+    As faixas são iguais para todos os buckets: [hist_min, hist_max] ou, sem
+    eles, o mínimo e o máximo do canal no intervalo, lidos do rollup.
+    source="rollup" combina as somas do agregado horário measurements_stats_1h
+    (só momentos, sem percentis e histogramas); source="raw" lê as amostras.
+    source="auto" usa o rollup sempre que possível. O rollup sobrevive à
+    retenção (RETENTION_DAYS só remove os chunks brutos), então resumos de
+    momentos de um ano saem dele mesmo sem os dados brutos; só a exclusão por
+    intervalo o rematerializa (refresh_rollups).
+    """
+    rollup_ok = not percentiles and not bins and bucket in ("hour", "day", "week")
+    if source == "auto":
+        source = "rollup" if rollup_ok else "raw"
+    params = {
+        "bus_id": bus_id, "start": start, "end": end, "width": BUCKET_WIDTHS[bucket], "tz": tz,
+        "pcts": list(percentiles), "bins": bins,
+    }
+    conn = get_read_conn()
+    with conn.cursor() as cur:
+        edges = {}
+        if bins:
+            if hist_min is not None and hist_max is not None:
+                edges = {c: (hist_min, hist_max) for c in channels}
+            else:
+                cur.execute(sql.SQL("""
+                    SELECT {} FROM measurements_stats_1h
+                     WHERE bus_id = %(bus_id)s
+                       AND bucket >= time_bucket(INTERVAL '1 hour', %(start)s::timestamptz)
+                       AND bucket < %(end)s;
+                """).format(sql.SQL(", ").join(
+                    sql.SQL("min({}), max({})").format(sql.Identifier(f"{c}_min"), sql.Identifier(f"{c}_max"))
+                    for c in channels
+                )), params)
+                row = cur.fetchone()
+                for i, c in enumerate(channels):
+                    lo, hi = row[2 * i], row[2 * i + 1]
+                    if lo is not None:
+                        # width_bucket exige limites distintos
+                        edges[c] = (float(lo), float(hi) if hi > lo else float(lo) + 1)
+
+        select = []
+        if source == "rollup":
+            for c in channels:
+                n, s, sq = (sql.Identifier(f"{c}_{k}") for k in ("n", "sum", "sq"))
+                select.append(sql.SQL("""
+                    sum({n})::bigint, min({mn}), max({mx}),
+                    sum({s}) / NULLIF(sum({n}), 0),
+                    sqrt(GREATEST((sum({sq}) - sum({s}) ^ 2 / NULLIF(sum({n}), 0)) / NULLIF(sum({n}) - 1, 0), 0))
+                """).format(n=n, s=s, sq=sq, mn=sql.Identifier(f"{c}_min"), mx=sql.Identifier(f"{c}_max")))
+            table, time_col = sql.Identifier("measurements_stats_1h"), sql.Identifier("bucket")
+        else:
+            for c in channels:
+                col = sql.Identifier(c)
+                parts = [sql.SQL("count({c}), min({c}), max({c}), avg({c})::float8, stddev_samp({c})::float8").format(c=col)]
+                if percentiles:
+                    parts.append(sql.SQL("percentile_cont(%(pcts)s::float8[]) WITHIN GROUP (ORDER BY {})").format(col))
+                if bins:
+                    lo, hi = edges.get(c, (0.0, 1.0))
+                    if hist_max is None:
+                        # limite superior é exclusivo: o máximo do canal entra na última faixa
+                        hi = math.nextafter(hi, math.inf)
+                    parts.append(sql.SQL("histogram({}::float8, {}, {}, %(bins)s)").format(
+                        col, sql.Literal(lo), sql.Literal(hi)
+                    ))
+                select.append(sql.SQL(", ").join(parts))
+            table, time_col = sql.Identifier("measurements"), sql.Identifier("timestamp")
+        cur.execute(sql.SQL("""
+            SELECT time_bucket(%(width)s::interval, {time}, %(tz)s) AS bucket, {select}
+              FROM {table}
+             WHERE bus_id = %(bus_id)s
+               AND {time} >= %(start)s AND {time} < %(end)s
+             GROUP BY 1
+             ORDER BY 1;
+        """).format(time=time_col, select=sql.SQL(", ").join(select), table=table), params)
+        rows = cur.fetchall()
+    conn.close()
+
+    width = 5 + (1 if source == "raw" and percentiles else 0) + (1 if source == "raw" and bins else 0)
+    result = []
+    for i, c in enumerate(channels):
+        base = 1 + i * width
+        lo, hi = edges.get(c, (None, None))
+        series = []
+        for r in rows:
+            n, mn, mx, mean, std = r[base:base + 5]
+            item = {"bucket": r[0], "count": n or 0, "min": mn, "max": mx, "mean": mean, "stddev": std}
+            k = base + 5
+            if source == "raw" and percentiles:
+                item["percentiles"] = dict(zip(map(_percentile_key, percentiles), r[k] or []))
+                k += 1
+            if source == "raw" and bins:
+                # histogram() devolve [abaixo, faixa 1..bins, acima]
+                h = r[k] if c in edges and r[k] else [0] * (bins + 2)
+                item["histogram"] = h[1:-1]
+                item["below"], item["above"] = h[0], h[-1]
+            series.append(item)
+        result.append({
+            "channel": c,
+            "histogram_edges": (
+                [lo + (hi - lo) * j / bins for j in range(bins + 1)] if bins and lo is not None else None
+            ),
+            "buckets": series,
+        })
+    return {
+        "bus_id": bus_id, "start": start, "end": end, "bucket": bucket, "source": source,
+        "percentiles": [_percentile_key(q) for q in percentiles], "channels": result,
+    }
+
+
+# ————— EVENTS —————
+
+def get_events(
+    start: datetime,
+    end: datetime,
+    bus_id: int = None,
+    kind: str = None,
+    limit: int = 1000
+):
+    """
+    Consultar eventos de qualidade de energia que se sobrepõem a [start, end].
+    Eventos ainda abertos têm end_time nulo.
+    """
+    where = ["start_time <= %s", "(end_time IS NULL OR end_time >= %s)"]
+    params = [end, start]
+    if bus_id is not None:
+        where.append("bus_id = %s")
+        params.append(bus_id)
+    if kind is not None:
+        where.append("kind = %s")
+        params.append(kind)
+    conn = get_db_conn()
+    with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+        cur.execute(f"""
+            SELECT * FROM pq_events
+             WHERE {' AND '.join(where)}
+             ORDER BY start_time DESC
              LIMIT %s;
-        """, (bus_id, n))
+        """, (*params, limit))
         rows = cur.fetchall()
     conn.close()
-    # Inverte a ordem para retornar do mais antigo para o mais recente
-    return [dict(r) for r in reversed(rows)]
+    return [dict(r) for r in rows]
 
 
 def get_setting(key: str):
@@ -367,7 +1002,11 @@ def get_all_settings():
 def get_measurements_last_n_hours(bus_id: int, hours: int):
     now = datetime.utcnow()
     since = now - timedelta(hours=hours)
-    conn = get_db_conn()
+    if RING_BUFFER_ENABLED:
+        rows = ring_store.since(bus_id, since)
+        if rows is not None:
+            return rows
+    conn = get_read_conn()
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
         cur.execute("""
             SELECT * FROM measurements
@@ -384,6 +1023,10 @@ from datetime import datetime, timedelta
 def get_measurements_last_n_minutes(bus_id: int, minutes: int):
     now = datetime.utcnow()
     since = now - timedelta(minutes=minutes)
+    if RING_BUFFER_ENABLED:
+        rows = ring_store.since(bus_id, since)
+        if rows is not None:
+            return rows
     conn = get_db_conn()
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
         cur.execute("""
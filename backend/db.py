@@ -1,56 +1,251 @@
 import os
+import threading
+import time
 import psycopg2
+import psycopg2.pool
 
-def get_db_conn():
-    return psycopg2.connect(
-        host=os.environ.get("DB_HOST", "localhost"),
-        port=int(os.environ.get("DB_PORT", 5432)),
+from deadline import current_scope
+from profiling import TimedCursor, current_profile, span
+
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 32))  # acima de READ + WRITE_MAX_CONCURRENCY
+
+# Réplica de streaming opcional para leituras analíticas pesadas
+DB_REPLICA_HOST          = os.environ.get("DB_REPLICA_HOST", "")
+DB_REPLICA_PORT          = int(os.environ.get("DB_REPLICA_PORT", os.environ.get("DB_PORT", 5432)))
+REPLICA_ENABLED          = bool(DB_REPLICA_HOST)
+REPLICA_MAX_LAG_S        = float(os.environ.get("REPLICA_MAX_LAG_S", 5))
+REPLICA_CHECK_INTERVAL_S = float(os.environ.get("REPLICA_CHECK_INTERVAL_S", 1))
+REPLICA_RETRY_S          = float(os.environ.get("REPLICA_RETRY_S", 10))
+
+
+def _connect_kwargs(host: str, port: int) -> dict:
+    return dict(
+        host=host,
+        port=port,
         dbname=os.environ.get("DB_NAME", "labrei_microgrid"),
         user=os.environ.get("DB_USER", "labrei_admin"),
         password=os.environ.get("DB_PASSWORD", "YOUR_STRONG_PASSWORD")
     )
 
-def ensure_tables():
-    conn = get_db_conn()
-    with conn.cursor() as cur:
-        # buses
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS buses (
-            id               SERIAL PRIMARY KEY,
-            bus_number       INTEGER NOT NULL UNIQUE,
-            name             VARCHAR(50) NOT NULL,
-            description      TEXT,
-            location         VARCHAR(100),
-            nominal_voltage  REAL,
-            nominal_current  REAL,
-            extra_parameters JSONB
-        );
-        """)
-
-        # measurements sem id, PK natural bus_id+timestamp
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS measurements (
-            bus_id    INTEGER      NOT NULL REFERENCES buses(bus_number),
-            timestamp TIMESTAMPTZ  NOT NULL,
-            freq_a    INTEGER, freq_b    INTEGER, freq_c    INTEGER,
-            va_rms    INTEGER, vb_rms    INTEGER, vc_rms    INTEGER,
-            ia_rms    INTEGER, ib_rms    INTEGER, ic_rms    INTEGER,
-            pa        INTEGER, pb        INTEGER, pc        INTEGER,
-            sa        INTEGER, sb        INTEGER, sc        INTEGER,
-            qa        INTEGER, qb        INTEGER, qc        INTEGER,
-            pfa       INTEGER, pfb       INTEGER, pfc       INTEGER,
-            va_p      INTEGER, vb_p      INTEGER, vc_p      INTEGER,
-            va_th     INTEGER, vb_th     INTEGER, vc_th     INTEGER,
-            ia_p      INTEGER, ib_p      INTEGER, ic_p      INTEGER,
-            ia_th     INTEGER, ib_th     INTEGER, ic_th     INTEGER,
-            PRIMARY KEY (bus_id, timestamp)
-        );
-        """)
-
-        # extensão e hypertable
-        cur.execute("CREATE EXTENSION IF NOT EXISTS timescaledb CASCADE;")
-        cur.execute("""
-            SELECT create_hypertable('measurements', 'timestamp', if_not_exists => TRUE);
-        """)
-    conn.commit()
-    conn.close()
+
+class PooledConnection:
+    """
+    Conexão emprestada de um pool. Repassa tudo para a conexão psycopg2, mas
+    `close()` devolve a conexão ao pool (desfazendo transação pendente) em vez
+    de fechá-la, então o padrão `conn = get_db_conn() ... conn.close()` do crud
+    continua valendo.
+    """
+
+    def __init__(self, pool: "ConnectionPool", conn, scope=None):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_scope", scope)
+
+    def __getattr__(self, name):
+        conn = object.__getattribute__(self, "_conn")
+        if conn is None:
+            if name == "closed":
+                return 1
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def cursor(self, *args, **kwargs):
+        cur = self._conn.cursor(*args, **kwargs)
+        profile = current_profile()
+        return TimedCursor(cur, profile) if profile is not None else cur
+
+    def close(self):
+        conn = object.__getattribute__(self, "_conn")
+        if conn is not None:
+            object.__setattr__(self, "_conn", None)
+            if self._scope is not None:
+                # antes do put: um cancelamento em curso termina antes de a
+                # conexão poder ir para outra requisição (QueryScope.release)
+                self._scope.detach(conn)
+            self._pool.put(conn)
+
+    def __del__(self):
+        # conexão esquecida sem close() não pode vazar do pool
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    ThreadedConnectionPool com espera: com as `maxconn` conexões em uso,
+    `get()` bloqueia até alguém devolver uma (o pool do psycopg2 levantaria
+    PoolError). O pool é criado na primeira conexão.
+    """
+
+    def __init__(self, name: str, host: str, port: int, minconn: int, maxconn: int):
+        self.name = name
+        self._kwargs = _connect_kwargs(host, port)
+        self._minconn, self._maxconn = minconn, maxconn
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._pool = None
+        self._lock = threading.Lock()
+        self.in_use = 0
+
+    def get(self) -> PooledConnection:
+        with span("db.connect"):
+            return self._get()
+
+    def _get(self) -> PooledConnection:
+        self._slots.acquire()
+        try:
+            if self._pool is None:
+                with self._lock:
+                    if self._pool is None:
+                        self._pool = psycopg2.pool.ThreadedConnectionPool(
+                            self._minconn, self._maxconn, **self._kwargs
+                        )
+            conn = self._pool.getconn()
+            if conn.closed:
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        self.in_use += 1
+        scope = current_scope()
+        pooled = PooledConnection(self, conn, scope)
+        if scope is not None:
+            # prazo da requisição; set_config local vale até o fim da transação
+            try:
+                scope.attach(conn)
+                with conn.cursor() as cur:
+                    cur.execute("SELECT set_config('statement_timeout', %s, true);", (str(scope.timeout_ms),))
+            except Exception:
+                pooled.close()
+                raise
+        return pooled
+
+    def put(self, conn):
+        try:
+            broken = bool(conn.closed)
+            if not broken:
+                try:
+                    if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                    if conn.autocommit:
+                        conn.autocommit = False
+                except psycopg2.Error:
+                    broken = True
+            self._pool.putconn(conn, close=broken)
+        finally:
+            self.in_use -= 1
+            self._slots.release()
+
+    @property
+    def warm(self) -> bool:
+        return self._pool is not None
+
+    def snapshot(self) -> dict:
+        return {"max": self._maxconn, "in_use": self.in_use, "warm": self.warm}
+
+
+class ReplicaRouter:
+    """
+    Decide se uma leitura pode ir para a réplica: só quando ela responde e o
+    atraso de replay está dentro de `max_lag_s` (medido no máximo a cada
+    `check_interval_s`). Réplica fora do ar fica de lado por `retry_s`; na
+    dúvida a leitura vai para o primário.
+    """
+
+    def __init__(self, pool: ConnectionPool, max_lag_s: float, check_interval_s: float, retry_s: float):
+        self.pool = pool
+        self.max_lag_s = max_lag_s
+        self.check_interval_s = check_interval_s
+        self.retry_s = retry_s
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._healthy = False
+        self._down_until = 0.0
+        self.lag_s = None
+        self.stats = {"replica_reads": 0, "primary_fallbacks": 0}
+
+    def usable(self) -> bool:
+        now = time.monotonic()
+        if now < self._down_until:
+            return False
+        with self._lock:
+            if now - self._checked_at >= self.check_interval_s:
+                self._checked_at = now
+                self._healthy = self._check()
+            return self._healthy
+
+    def mark_down(self, error):
+        print(f"[db] replica unavailable, reading from primary: {error}")
+        self._down_until = time.monotonic() + self.retry_s
+        self._healthy = False
+        self.lag_s = None
+
+    def _check(self) -> bool:
+        try:
+            conn = self.pool.get()
+            try:
+                with conn.cursor() as cur:
+                    # sem WAL pendente a réplica está em dia, mesmo sem escritas recentes
+                    cur.execute("""
+                        SELECT CASE
+                                 WHEN NOT pg_is_in_recovery() THEN NULL
+                                 WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                                 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+                               END;
+                    """)
+                    lag = cur.fetchone()[0]
+            finally:
+                conn.close()
+        except psycopg2.Error as e:
+            self.mark_down(e)
+            return False
+        self.lag_s = None if lag is None else float(lag)
+        return self.lag_s is not None and self.lag_s <= self.max_lag_s
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": True, "healthy": self._healthy, "lag_s": self.lag_s,
+            "max_lag_s": self.max_lag_s, **self.stats, "pool": self.pool.snapshot(),
+        }
+
+
+primary_pool = ConnectionPool(
+    "primary", os.environ.get("DB_HOST", "localhost"), int(os.environ.get("DB_PORT", 5432)),
+    DB_POOL_MIN, DB_POOL_MAX
+)
+replica = ReplicaRouter(
+    ConnectionPool("replica", DB_REPLICA_HOST, DB_REPLICA_PORT, DB_POOL_MIN, DB_POOL_MAX),
+    REPLICA_MAX_LAG_S, REPLICA_CHECK_INTERVAL_S, REPLICA_RETRY_S
+) if REPLICA_ENABLED else None
+
+def get_db_conn():
+    """Conexão com o primário: escritas e leituras que precisam ver as próprias escritas."""
+    return primary_pool.get()
+
+def get_read_conn():
+    """
+    Conexão para leituras analíticas que toleram até REPLICA_MAX_LAG_S de
+    atraso: réplica quando configurada e em dia, senão o primário.
+    """
+    if replica is not None:
+        if replica.usable():
+            try:
+                conn = replica.pool.get()
+                replica.stats["replica_reads"] += 1
+                return conn
+            except psycopg2.Error as e:
+                replica.mark_down(e)
+        replica.stats["primary_fallbacks"] += 1
+    return primary_pool.get()
+
+def db_stats() -> dict:
+    return {
+        "primary": primary_pool.snapshot(),
+        "replica": replica.snapshot() if replica is not None else {"enabled": False},
+    }
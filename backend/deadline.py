@@ -0,0 +1,109 @@
+import asyncio
+import os
+import threading
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Depends, Request
+
+# Prazos por classe de endpoint (statement_timeout de cada consulta, em ms)
+QUERY_TIMEOUT_MS       = int(os.environ.get("QUERY_TIMEOUT_MS", 10_000))
+HEAVY_QUERY_TIMEOUT_MS = int(os.environ.get("HEAVY_QUERY_TIMEOUT_MS", 60_000))
+DISCONNECT_POLL_S      = float(os.environ.get("DISCONNECT_POLL_MS", 250)) / 1000
+
+
+class QueryScope:
+    """
+    Escopo das consultas de uma requisição: o prazo aplicado como
+    statement_timeout em cada conexão emprestada do pool e o conjunto de
+    conexões em uso, para cancelar o statement em andamento (pg_cancel via
+    `conn.cancel()`) quando o cliente desconecta.
+
+    `holds` conta as requisições interessadas no resultado: uma requisição que
+    pega carona numa consulta coalescida (single-flight) segura o escopo do
+    líder, e a consulta só é cancelada quando todas elas desistem.
+    """
+
+    def __init__(self, timeout_ms: int):
+        self.timeout_ms = timeout_ms
+        self.cancelled = False
+        self.holds = 1
+        self._lock = threading.Lock()
+        self._conns = set()
+        self._shared = None   # escopo do líder quando esta requisição é carona
+
+    def attach(self, conn):
+        with self._lock:
+            if self.cancelled:
+                raise ClientDisconnected()
+            self._conns.add(conn)
+
+    def detach(self, conn):
+        with self._lock:
+            self._conns.discard(conn)
+
+    def share(self, leader: "QueryScope"):
+        """Passa a depender da consulta do líder (chamado pelo single-flight)."""
+        with leader._lock:
+            leader.holds += 1
+        self._shared = leader
+
+    def release(self):
+        """O cliente desta requisição foi embora."""
+        if self._shared is not None:
+            self._shared.release()
+            return
+        with self._lock:
+            self.holds -= 1
+            if self.holds > 0 or self.cancelled:
+                return
+            self.cancelled = True
+            # cancela ainda com o lock: PooledConnection.close() faz detach (que
+            # espera este lock) antes de devolver a conexão ao pool, então uma
+            # conexão no conjunto ainda é desta requisição e o cancelamento não
+            # atinge a consulta de quem a pegar em seguida
+            for conn in self._conns:
+                try:
+                    conn.cancel()
+                except Exception:
+                    pass
+
+    def check(self):
+        """Interrompe trabalho pós-consulta (ex.: serialização) de quem já desistiu."""
+        if self.cancelled:
+            raise ClientDisconnected()
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+_current: ContextVar[Optional[QueryScope]] = ContextVar("query_scope", default=None)
+
+def current_scope() -> Optional[QueryScope]:
+    return _current.get()
+
+
+def query_deadline(timeout_ms: int):
+    """
+    Dependência de endpoint: abre um QueryScope com o prazo dado (herdado pelo
+    threadpool via contextvars) e vigia a conexão HTTP enquanto o endpoint roda.
+    """
+    async def dependency(request: Request):
+        scope = QueryScope(timeout_ms)
+        request.state.query_scope = scope
+        _current.set(scope)
+        watcher = asyncio.create_task(_watch(request, scope))
+        try:
+            yield scope
+        finally:
+            watcher.cancel()
+    return Depends(dependency)
+
+
+async def _watch(request: Request, scope: QueryScope):
+    while True:
+        await asyncio.sleep(DISCONNECT_POLL_S)
+        if await request.is_disconnected():
+            scope.release()
+            return
@@ -0,0 +1,230 @@
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from db import get_db_conn
+from models import Measurement
+
+# Limiares (p.u. do nominal do barramento, salvo indicação) e histerese de fechamento
+SAG_PU           = float(os.environ.get("PQ_SAG_PU", 0.90))
+SWELL_PU         = float(os.environ.get("PQ_SWELL_PU", 1.10))
+VOLTAGE_HYST_PU  = float(os.environ.get("PQ_VOLTAGE_HYST_PU", 0.02))
+OVERCURRENT_PU   = float(os.environ.get("PQ_OVERCURRENT_PU", 1.10))
+CURRENT_HYST_PU  = float(os.environ.get("PQ_CURRENT_HYST_PU", 0.05))
+FREQ_DEV_HZ      = float(os.environ.get("PQ_FREQ_DEV_HZ", 0.5))
+FREQ_HYST_HZ     = float(os.environ.get("PQ_FREQ_HYST_HZ", 0.1))
+PF_MIN           = float(os.environ.get("PQ_PF_MIN", 0.92))
+PF_HYST          = float(os.environ.get("PQ_PF_HYST", 0.01))
+PF_MIN_LOAD_PU   = float(os.environ.get("PQ_PF_MIN_LOAD_PU", 0.05))
+NOMINAL_FREQUENCY = float(os.environ.get("NOMINAL_FREQUENCY", 50.0))
+
+EVENT_KINDS = ("sag", "swell", "overcurrent", "freq_deviation", "low_pf")
+
+PHASES = ("a", "b", "c")
+
+
+class _Rule:
+    """
+    Regra de evento com histerese sobre um canal.
+    `trigger(x)` abre o evento; `clear(x)` fecha. O extremo é o valor mais
+    afastado do normal (`worse`: min ou max) observado durante o evento.
+    """
+
+    def __init__(self, kind, channel, trigger, clear, worse, nominal, scale=1.0, enabled=None):
+        self.kind = kind
+        self.channel = channel
+        self.trigger = trigger
+        self.clear = clear
+        self.worse = worse
+        self.nominal = nominal
+        self.scale = scale
+        self.enabled = enabled or (lambda m: True)
+
+    def value(self, m: Measurement) -> Optional[float]:
+        raw = getattr(m, self.channel)
+        return None if raw is None else raw / self.scale
+
+
+def _rules_for(nominal_v: Optional[float], nominal_i: Optional[float], nominal_f: float) -> List[_Rule]:
+    rules = []
+    for ph in PHASES:
+        if nominal_v:
+            rules.append(_Rule(
+                "sag", f"v{ph}_rms",
+                trigger=lambda x, n=nominal_v: x < SAG_PU * n,
+                clear=lambda x, n=nominal_v: x > (SAG_PU + VOLTAGE_HYST_PU) * n,
+                worse=min, nominal=nominal_v
+            ))
+            rules.append(_Rule(
+                "swell", f"v{ph}_rms",
+                trigger=lambda x, n=nominal_v: x > SWELL_PU * n,
+                clear=lambda x, n=nominal_v: x < (SWELL_PU - VOLTAGE_HYST_PU) * n,
+                worse=max, nominal=nominal_v
+            ))
+        if nominal_i:
+            rules.append(_Rule(
+                "overcurrent", f"i{ph}_rms",
+                trigger=lambda x, n=nominal_i: x > OVERCURRENT_PU * n,
+                clear=lambda x, n=nominal_i: x < (OVERCURRENT_PU - CURRENT_HYST_PU) * n,
+                worse=max, nominal=nominal_i
+            ))
+        rules.append(_Rule(
+            "freq_deviation", f"freq_{ph}",
+            trigger=lambda x, n=nominal_f: abs(x - n) > FREQ_DEV_HZ,
+            clear=lambda x, n=nominal_f: abs(x - n) < FREQ_DEV_HZ - FREQ_HYST_HZ,
+            worse=lambda a, b, n=nominal_f: a if abs(a - n) >= abs(b - n) else b,
+            nominal=nominal_f
+        ))
+        # FP armazenado x1000; ignorado com carga muito baixa (FP sem significado)
+        current = f"i{ph}_rms"
+        rules.append(_Rule(
+            "low_pf", f"pf{ph}",
+            trigger=lambda x: x < PF_MIN,
+            clear=lambda x: x > PF_MIN + PF_HYST,
+            worse=min, nominal=1.0, scale=1000.0,
+            enabled=lambda m, c=current, n=nominal_i: (
+                not n or (getattr(m, c) or 0) >= PF_MIN_LOAD_PU * n
+            )
+        ))
+    return rules
+
+
+class _BusState:
+    def __init__(self, rules: List[_Rule]):
+        self.lock = threading.Lock()
+        self.rules = rules
+        self.last_ts: Optional[datetime] = None
+        # (kind, channel) -> evento aberto {"id", "start", "extremum", "extremum_time"}
+        self.open: Dict[tuple, dict] = {}
+
+
+class EventDetector:
+    """
+    Detector incremental de eventos de qualidade de energia, alimentado pelo
+    caminho de inserção de medições. Mantém em memória, por barramento, os
+    eventos abertos; no banco só grava a abertura (INSERT) e o fechamento
+    (UPDATE com fim e extremo) de cada evento.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buses: Dict[int, _BusState] = {}
+
+    def invalidate(self, bus_id: Optional[int] = None):
+        """Força recarregar nominais (após criar/alterar barramento)."""
+        with self._lock:
+            if bus_id is None:
+                self._buses.clear()
+            else:
+                self._buses.pop(bus_id, None)
+
+    def observe(self, measurements: Iterable[Measurement]):
+        # a API aceita timestamps com e sem fuso; sem fuso é UTC (como em crud._note_latest)
+        measurements = [
+            m.model_copy(update={"timestamp": m.timestamp.replace(tzinfo=timezone.utc)})
+            if m.timestamp.tzinfo is None else m
+            for m in measurements
+        ]
+        for m in sorted(measurements, key=lambda m: (m.bus_id, m.timestamp)):
+            state = self._state(m.bus_id)
+            if state is None:
+                continue
+            with state.lock:
+                # amostras fora de ordem não alteram o estado dos eventos
+                if state.last_ts is not None and m.timestamp <= state.last_ts:
+                    continue
+                state.last_ts = m.timestamp
+                for rule in state.rules:
+                    self._apply(m, state, rule)
+
+    def _apply(self, m: Measurement, state: _BusState, rule: _Rule):
+        x = rule.value(m)
+        if x is None:
+            return
+        key = (rule.kind, rule.channel)
+        ev = state.open.get(key)
+        if ev is None:
+            if rule.enabled(m) and rule.trigger(x):
+                ev = {"start": m.timestamp, "extremum": x, "extremum_time": m.timestamp}
+                ev["id"] = _insert_event(m.bus_id, rule, ev)
+                state.open[key] = ev
+            return
+        worst = rule.worse(ev["extremum"], x)
+        if worst != ev["extremum"]:
+            ev["extremum"], ev["extremum_time"] = worst, m.timestamp
+        if rule.clear(x):
+            _close_event(ev, m.timestamp)
+            del state.open[key]
+
+    def _state(self, bus_id: int) -> Optional[_BusState]:
+        with self._lock:
+            state = self._buses.get(bus_id)
+        if state is not None:
+            return state
+        state = _load_state(bus_id)
+        if state is None:
+            return None
+        with self._lock:
+            return self._buses.setdefault(bus_id, state)
+
+
+def _load_state(bus_id: int) -> Optional[_BusState]:
+    """Carrega nominais do barramento e eventos ainda abertos no banco (ex.: após restart)."""
+    conn = get_db_conn()
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT nominal_voltage, nominal_current, extra_parameters
+              FROM buses WHERE bus_number = %s;
+        """, (bus_id,))
+        row = cur.fetchone()
+        if row is None:
+            conn.close()
+            return None
+        nominal_v, nominal_i, extra = row
+        nominal_f = float((extra or {}).get("nominal_frequency", NOMINAL_FREQUENCY))
+        state = _BusState(_rules_for(nominal_v, nominal_i, nominal_f))
+        cur.execute("""
+            SELECT id, kind, channel, start_time, extremum, extremum_time
+              FROM pq_events
+             WHERE bus_id = %s AND end_time IS NULL;
+        """, (bus_id,))
+        for ev_id, kind, channel, start, extremum, extremum_time in cur.fetchall():
+            state.open[(kind, channel)] = {
+                "id": ev_id, "start": start,
+                "extremum": extremum, "extremum_time": extremum_time,
+            }
+    conn.close()
+    return state
+
+
+def _insert_event(bus_id: int, rule: _Rule, ev: dict) -> int:
+    conn = get_db_conn()
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO pq_events
+              (bus_id, kind, channel, start_time, extremum, extremum_time, nominal)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            RETURNING id;
+        """, (bus_id, rule.kind, rule.channel, ev["start"],
+              ev["extremum"], ev["extremum_time"], rule.nominal))
+        ev_id = cur.fetchone()[0]
+    conn.commit()
+    conn.close()
+    return ev_id
+
+
+def _close_event(ev: dict, end: datetime):
+    conn = get_db_conn()
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE pq_events
+               SET end_time = %s, extremum = %s, extremum_time = %s
+             WHERE id = %s;
+        """, (end, ev["extremum"], ev["extremum_time"], ev["id"]))
+    conn.commit()
+    conn.close()
+
+
+# Instância única do processo
+detector = EventDetector()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+import hashlib
+import os
+import re
+from typing import List, Tuple
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Chave do advisory lock que serializa instâncias do backend subindo juntas
+MIGRATION_LOCK_KEY = int.from_bytes(b"LRmg", "big") & 0x7FFFFFFF
+
+_FILE_RE = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+
+
+def available() -> List[Tuple[int, str, str]]:
+    """Migrações em migrations/ como (versão, nome, caminho), em ordem de versão."""
+    found = []
+    for fname in os.listdir(MIGRATIONS_DIR):
+        m = _FILE_RE.match(fname)
+        if m:
+            found.append((int(m.group(1)), m.group(2), os.path.join(MIGRATIONS_DIR, fname)))
+    found.sort()
+    versions = [v for v, _, _ in found]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"duplicate migration versions in {MIGRATIONS_DIR}")
+    return found
+
+
+def latest_version() -> int:
+    migrations = available()
+    return migrations[-1][0] if migrations else 0
+
+
+def current_version(conn) -> int:
+    """Versão aplicada no banco (0 se a tabela schema_version ainda não existe)."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('schema_version') IS NOT NULL;")
+        if not cur.fetchone()[0]:
+            conn.rollback()
+            return 0
+        cur.execute("SELECT coalesce(max(version), 0) FROM schema_version;")
+        version = cur.fetchone()[0]
+    conn.rollback()
+    return version
+
+
+def migrate(conn) -> int:
+    """
+    Leva o esquema à versão mais recente e retorna a versão final. Se o banco
+    já está em dia, custa uma consulta e não toma lock nenhum. Caso contrário,
+    segura um advisory lock de sessão (outra instância subindo ao mesmo tempo
+    espera e depois encontra tudo aplicado) e aplica cada migração pendente na
+    sua própria transação, junto com o registro em schema_version.
+    """
+    target = latest_version()
+    if current_version(conn) >= target:
+        return target
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_KEY,))
+    conn.commit()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version    INTEGER     PRIMARY KEY,
+                    name       TEXT        NOT NULL,
+                    checksum   TEXT        NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                );
+            """)
+            cur.execute("SELECT version, checksum FROM schema_version;")
+            applied = dict(cur.fetchall())
+        conn.commit()
+
+        for version, name, path in available():
+            with open(path, encoding="utf-8") as f:
+                script = f.read()
+            checksum = hashlib.sha256(script.encode("utf-8")).hexdigest()
+            if version in applied:
+                if applied[version] != checksum:
+                    print(f"[migrate] warning: {version}_{name} changed after being applied")
+                continue
+            with conn.cursor() as cur:
+                cur.execute(script)
+                cur.execute(
+                    "INSERT INTO schema_version (version, name, checksum) VALUES (%s, %s, %s);",
+                    (version, name, checksum)
+                )
+            conn.commit()
+            print(f"[migrate] applied {version}_{name}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_KEY,))
+        conn.commit()
+    return current_version(conn)
+
+
+if __name__ == "__main__":
+    from db import get_db_conn
+
+    conn = get_db_conn()
+    try:
+        print(f"[migrate] schema at version {migrate(conn)}")
+    finally:
+        conn.close()
@@ -0,0 +1,61 @@
+-- Esquema base. Tudo com IF NOT EXISTS para que bancos criados antes das
+-- migrações (pelo antigo wait_for_postgres.py) sejam adotados sem erro.
+
+CREATE EXTENSION IF NOT EXISTS timescaledb CASCADE;
+
+CREATE TABLE IF NOT EXISTS settings (
+    key        VARCHAR(64) PRIMARY KEY,
+    value      TEXT NOT NULL,
+    type       VARCHAR(16) DEFAULT 'int',
+    updated_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS buses (
+    id               SERIAL PRIMARY KEY,
+    bus_number       INTEGER NOT NULL UNIQUE,
+    name             VARCHAR(50) NOT NULL,
+    description      TEXT,
+    location         VARCHAR(100),
+    nominal_voltage  REAL,
+    nominal_current  REAL,
+    extra_parameters JSONB
+);
+
+-- measurements sem id, PK natural bus_id+timestamp
+CREATE TABLE IF NOT EXISTS measurements (
+    bus_id    INTEGER      NOT NULL REFERENCES buses(bus_number),
+    timestamp TIMESTAMPTZ  NOT NULL,
+    freq_a    INTEGER, freq_b    INTEGER, freq_c    INTEGER,
+    va_rms    INTEGER, vb_rms    INTEGER, vc_rms    INTEGER,
+    ia_rms    INTEGER, ib_rms    INTEGER, ic_rms    INTEGER,
+    pa        INTEGER, pb        INTEGER, pc        INTEGER,
+    sa        INTEGER, sb        INTEGER, sc        INTEGER,
+    qa        INTEGER, qb        INTEGER, qc        INTEGER,
+    pfa       INTEGER, pfb       INTEGER, pfc       INTEGER,
+    va_p      INTEGER, vb_p      INTEGER, vc_p      INTEGER,
+    va_th     INTEGER, vb_th     INTEGER, vc_th     INTEGER,
+    ia_p      INTEGER, ib_p      INTEGER, ic_p      INTEGER,
+    ia_th     INTEGER, ib_th     INTEGER, ic_th     INTEGER,
+    PRIMARY KEY (bus_id, timestamp)
+);
+
+SELECT create_hypertable('measurements', 'timestamp', if_not_exists => TRUE);
+
+-- eventos de qualidade de energia (detector incremental em events.py)
+CREATE TABLE IF NOT EXISTS pq_events (
+    id            BIGSERIAL    PRIMARY KEY,
+    bus_id        INTEGER      NOT NULL REFERENCES buses(bus_number),
+    kind          VARCHAR(16)  NOT NULL,
+    channel       VARCHAR(16)  NOT NULL,
+    start_time    TIMESTAMPTZ  NOT NULL,
+    end_time      TIMESTAMPTZ,
+    extremum      REAL,
+    extremum_time TIMESTAMPTZ,
+    nominal       REAL
+);
+
+CREATE INDEX IF NOT EXISTS pq_events_bus_kind_start_idx
+    ON pq_events (bus_id, kind, start_time DESC);
+
+CREATE INDEX IF NOT EXISTS pq_events_start_idx
+    ON pq_events (start_time DESC);
@@ -1,3 +1,6 @@
+-- Dados iniciais. DO NOTHING: valores alterados pelo operador (ex.:
+-- api_update_time) não são sobrescritos.
+
 INSERT INTO buses (bus_number, name, description, location, nominal_voltage, nominal_current, extra_parameters)
 VALUES
   (1, 'Main Bus',        'Main feeder',        'Lab 1', 220.0, 100.0, '{"manufacturer": "Siemens"}'),
@@ -14,3 +17,12 @@ VALUES
   (12, 'Test Bus 3',     'For testing',        'Lab 1', 220.0, 30.0,  '{}'),
   (13, 'External Bus',   'External source',    'Yard',  380.0, 100.0, '{}')
 ON CONFLICT (bus_number) DO NOTHING;
+
+INSERT INTO settings (key, value, type)
+VALUES
+  ('api_update_time',      '10', 'int'),
+  ('modbus_update_time',   '5',  'int'),
+  ('RETENTION_DAYS',       '30', 'int'),
+  ('COMPRESS_AFTER_HOURS', '24', 'int'),
+  ('RUN_INTERVAL_HOURS',   '1',  'int')
+ON CONFLICT (key) DO NOTHING;
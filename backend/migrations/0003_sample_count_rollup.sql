@@ -0,0 +1,22 @@
+-- Rollup horário de contagem de amostras por barramento (relatório de falhas
+-- de coleta, crud.get_gap_report). Agregado contínuo com agregação em tempo
+-- real: a parte ainda não materializada vem direto de measurements.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS measurements_samples_1h
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT bus_id,
+       time_bucket(INTERVAL '1 hour', timestamp) AS bucket,
+       count(*)       AS samples,
+       min(timestamp) AS first_ts,
+       max(timestamp) AS last_ts
+  FROM measurements
+ GROUP BY bus_id, bucket
+WITH NO DATA;
+
+-- start_offset nulo: a primeira execução materializa todo o histórico; as
+-- seguintes só recalculam as faixas invalidadas (ingestão atrasada, backfill, deletes)
+SELECT add_continuous_aggregate_policy('measurements_samples_1h',
+    start_offset      => NULL,
+    end_offset        => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '30 minutes',
+    if_not_exists     => TRUE);
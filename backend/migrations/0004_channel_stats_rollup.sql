@@ -0,0 +1,52 @@
+-- Rollup horário de estatísticas mescláveis por canal (crud.get_channel_summary):
+-- contagem, soma, soma dos quadrados, mínimo e máximo. Daí saem count, min,
+-- max, média e desvio padrão de qualquer bucket de uma hora ou mais sem ler
+-- as amostras. Percentis e histogramas não são mescláveis e vêm dos dados brutos.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS measurements_stats_1h
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT bus_id,
+       time_bucket(INTERVAL '1 hour', timestamp) AS bucket,
+       count(*) AS samples,
+       count(freq_a) AS freq_a_n, sum(freq_a)::float8 AS freq_a_sum, sum(freq_a::float8 * freq_a) AS freq_a_sq, min(freq_a) AS freq_a_min, max(freq_a) AS freq_a_max,
+       count(freq_b) AS freq_b_n, sum(freq_b)::float8 AS freq_b_sum, sum(freq_b::float8 * freq_b) AS freq_b_sq, min(freq_b) AS freq_b_min, max(freq_b) AS freq_b_max,
+       count(freq_c) AS freq_c_n, sum(freq_c)::float8 AS freq_c_sum, sum(freq_c::float8 * freq_c) AS freq_c_sq, min(freq_c) AS freq_c_min, max(freq_c) AS freq_c_max,
+       count(va_rms) AS va_rms_n, sum(va_rms)::float8 AS va_rms_sum, sum(va_rms::float8 * va_rms) AS va_rms_sq, min(va_rms) AS va_rms_min, max(va_rms) AS va_rms_max,
+       count(vb_rms) AS vb_rms_n, sum(vb_rms)::float8 AS vb_rms_sum, sum(vb_rms::float8 * vb_rms) AS vb_rms_sq, min(vb_rms) AS vb_rms_min, max(vb_rms) AS vb_rms_max,
+       count(vc_rms) AS vc_rms_n, sum(vc_rms)::float8 AS vc_rms_sum, sum(vc_rms::float8 * vc_rms) AS vc_rms_sq, min(vc_rms) AS vc_rms_min, max(vc_rms) AS vc_rms_max,
+       count(ia_rms) AS ia_rms_n, sum(ia_rms)::float8 AS ia_rms_sum, sum(ia_rms::float8 * ia_rms) AS ia_rms_sq, min(ia_rms) AS ia_rms_min, max(ia_rms) AS ia_rms_max,
+       count(ib_rms) AS ib_rms_n, sum(ib_rms)::float8 AS ib_rms_sum, sum(ib_rms::float8 * ib_rms) AS ib_rms_sq, min(ib_rms) AS ib_rms_min, max(ib_rms) AS ib_rms_max,
+       count(ic_rms) AS ic_rms_n, sum(ic_rms)::float8 AS ic_rms_sum, sum(ic_rms::float8 * ic_rms) AS ic_rms_sq, min(ic_rms) AS ic_rms_min, max(ic_rms) AS ic_rms_max,
+       count(pa) AS pa_n, sum(pa)::float8 AS pa_sum, sum(pa::float8 * pa) AS pa_sq, min(pa) AS pa_min, max(pa) AS pa_max,
+       count(pb) AS pb_n, sum(pb)::float8 AS pb_sum, sum(pb::float8 * pb) AS pb_sq, min(pb) AS pb_min, max(pb) AS pb_max,
+       count(pc) AS pc_n, sum(pc)::float8 AS pc_sum, sum(pc::float8 * pc) AS pc_sq, min(pc) AS pc_min, max(pc) AS pc_max,
+       count(sa) AS sa_n, sum(sa)::float8 AS sa_sum, sum(sa::float8 * sa) AS sa_sq, min(sa) AS sa_min, max(sa) AS sa_max,
+       count(sb) AS sb_n, sum(sb)::float8 AS sb_sum, sum(sb::float8 * sb) AS sb_sq, min(sb) AS sb_min, max(sb) AS sb_max,
+       count(sc) AS sc_n, sum(sc)::float8 AS sc_sum, sum(sc::float8 * sc) AS sc_sq, min(sc) AS sc_min, max(sc) AS sc_max,
+       count(qa) AS qa_n, sum(qa)::float8 AS qa_sum, sum(qa::float8 * qa) AS qa_sq, min(qa) AS qa_min, max(qa) AS qa_max,
+       count(qb) AS qb_n, sum(qb)::float8 AS qb_sum, sum(qb::float8 * qb) AS qb_sq, min(qb) AS qb_min, max(qb) AS qb_max,
+       count(qc) AS qc_n, sum(qc)::float8 AS qc_sum, sum(qc::float8 * qc) AS qc_sq, min(qc) AS qc_min, max(qc) AS qc_max,
+       count(pfa) AS pfa_n, sum(pfa)::float8 AS pfa_sum, sum(pfa::float8 * pfa) AS pfa_sq, min(pfa) AS pfa_min, max(pfa) AS pfa_max,
+       count(pfb) AS pfb_n, sum(pfb)::float8 AS pfb_sum, sum(pfb::float8 * pfb) AS pfb_sq, min(pfb) AS pfb_min, max(pfb) AS pfb_max,
+       count(pfc) AS pfc_n, sum(pfc)::float8 AS pfc_sum, sum(pfc::float8 * pfc) AS pfc_sq, min(pfc) AS pfc_min, max(pfc) AS pfc_max,
+       count(va_p) AS va_p_n, sum(va_p)::float8 AS va_p_sum, sum(va_p::float8 * va_p) AS va_p_sq, min(va_p) AS va_p_min, max(va_p) AS va_p_max,
+       count(vb_p) AS vb_p_n, sum(vb_p)::float8 AS vb_p_sum, sum(vb_p::float8 * vb_p) AS vb_p_sq, min(vb_p) AS vb_p_min, max(vb_p) AS vb_p_max,
+       count(vc_p) AS vc_p_n, sum(vc_p)::float8 AS vc_p_sum, sum(vc_p::float8 * vc_p) AS vc_p_sq, min(vc_p) AS vc_p_min, max(vc_p) AS vc_p_max,
+       count(va_th) AS va_th_n, sum(va_th)::float8 AS va_th_sum, sum(va_th::float8 * va_th) AS va_th_sq, min(va_th) AS va_th_min, max(va_th) AS va_th_max,
+       count(vb_th) AS vb_th_n, sum(vb_th)::float8 AS vb_th_sum, sum(vb_th::float8 * vb_th) AS vb_th_sq, min(vb_th) AS vb_th_min, max(vb_th) AS vb_th_max,
+       count(vc_th) AS vc_th_n, sum(vc_th)::float8 AS vc_th_sum, sum(vc_th::float8 * vc_th) AS vc_th_sq, min(vc_th) AS vc_th_min, max(vc_th) AS vc_th_max,
+       count(ia_p) AS ia_p_n, sum(ia_p)::float8 AS ia_p_sum, sum(ia_p::float8 * ia_p) AS ia_p_sq, min(ia_p) AS ia_p_min, max(ia_p) AS ia_p_max,
+       count(ib_p) AS ib_p_n, sum(ib_p)::float8 AS ib_p_sum, sum(ib_p::float8 * ib_p) AS ib_p_sq, min(ib_p) AS ib_p_min, max(ib_p) AS ib_p_max,
+       count(ic_p) AS ic_p_n, sum(ic_p)::float8 AS ic_p_sum, sum(ic_p::float8 * ic_p) AS ic_p_sq, min(ic_p) AS ic_p_min, max(ic_p) AS ic_p_max,
+       count(ia_th) AS ia_th_n, sum(ia_th)::float8 AS ia_th_sum, sum(ia_th::float8 * ia_th) AS ia_th_sq, min(ia_th) AS ia_th_min, max(ia_th) AS ia_th_max,
+       count(ib_th) AS ib_th_n, sum(ib_th)::float8 AS ib_th_sum, sum(ib_th::float8 * ib_th) AS ib_th_sq, min(ib_th) AS ib_th_min, max(ib_th) AS ib_th_max,
+       count(ic_th) AS ic_th_n, sum(ic_th)::float8 AS ic_th_sum, sum(ic_th::float8 * ic_th) AS ic_th_sq, min(ic_th) AS ic_th_min, max(ic_th) AS ic_th_max
+  FROM measurements
+ GROUP BY bus_id, bucket
+WITH NO DATA;
+
+SELECT add_continuous_aggregate_policy('measurements_stats_1h',
+    start_offset      => NULL,
+    end_offset        => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '30 minutes',
+    if_not_exists     => TRUE);
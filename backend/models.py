@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from datetime import datetime
 
 class Bus(BaseModel):
@@ -54,3 +54,106 @@ class Setting(BaseModel):
     value: int  # ou Union[str, int, float] se preferir
     type: Optional[str] = "int"
     updated_at: Optional[datetime] = None
+
+
+class DerivedMetrics(BaseModel):
+    bucket: datetime
+    samples: int
+    p_total_avg: Optional[float] = None
+    p_total_max: Optional[float] = None
+    q_total_avg: Optional[float] = None
+    s_total_avg: Optional[float] = None
+    pf_total: Optional[float] = None
+    energy_kwh: Optional[float] = None
+    energy_kvarh: Optional[float] = None
+    voltage_unbalance_avg: Optional[float] = None
+    voltage_unbalance_max: Optional[float] = None
+    current_unbalance_avg: Optional[float] = None
+    current_unbalance_max: Optional[float] = None
+    apparent_power_mismatch_avg: Optional[float] = None
+
+
+class PQEvent(BaseModel):
+    id: int
+    bus_id: int
+    kind: str
+    channel: str
+    start_time: datetime
+    end_time: Optional[datetime] = None
+    extremum: Optional[float] = None
+    extremum_time: Optional[datetime] = None
+    nominal: Optional[float] = None
+
+
+class AlignedColumn(BaseModel):
+    bus_id: int
+    channel: str
+    values: List[Optional[float]]
+
+
+class AlignedMeasurements(BaseModel):
+    time: List[datetime]
+    columns: List[AlignedColumn]
+
+
+class SamplingGap(BaseModel):
+    start: datetime
+    end: datetime
+    duration_s: float
+    missing_samples: Optional[int] = None
+
+
+class SamplingBucket(BaseModel):
+    bucket: datetime
+    samples: int
+    expected: Optional[float] = None
+    completeness: Optional[float] = None
+
+
+class GapReport(BaseModel):
+    bus_id: int
+    start: datetime
+    end: datetime
+    source: str
+    cadence_s: Optional[float] = None
+    gap_threshold_s: Optional[float] = None
+    samples: int
+    expected_samples: Optional[float] = None
+    completeness: Optional[float] = None
+    gaps: List[SamplingGap]
+    gaps_truncated: bool
+    buckets: List[SamplingBucket]
+
+
+class ChannelStatsBucket(BaseModel):
+    bucket: datetime
+    count: int
+    min: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+    stddev: Optional[float] = None
+    percentiles: Optional[Dict[str, Optional[float]]] = None
+    histogram: Optional[List[int]] = None
+    below: Optional[int] = None
+    above: Optional[int] = None
+
+
+class ChannelStats(BaseModel):
+    channel: str
+    histogram_edges: Optional[List[float]] = None
+    buckets: List[ChannelStatsBucket]
+
+
+class ChannelSummary(BaseModel):
+    bus_id: int
+    start: datetime
+    end: datetime
+    bucket: str
+    source: str
+    percentiles: List[str]
+    channels: List[ChannelStats]
+
+
+class DeleteResult(BaseModel):
+    rows_deleted: int
+    chunks_dropped: int
@@ -0,0 +1,64 @@
+import os
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import numpy as np
+
+from models import Measurement
+
+PACKED_MEDIA_TYPE = "application/vnd.labrei.measurements+packed"
+PACKED_MAX_ROWS   = int(os.environ.get("PACKED_MAX_ROWS", 100_000))
+
+CHANNELS = tuple(Measurement.model_fields.keys())[2:]
+NULL_INT32 = np.iinfo(np.int32).min
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Layout (little-endian), colunar:
+#   cabeçalho  magic "LRM1", uint32 nº de linhas, uint16 nº de canais (33), 2 bytes reservados
+#   bus_id     int32[linhas]
+#   timestamp  int64[linhas]  (µs desde a época, UTC)
+#   canais     int32[canais][linhas], um canal inteiro após o outro, na ordem de Measurement
+# INT32_MIN num canal representa NULL.
+MAGIC = b"LRM1"
+HEADER = struct.Struct("<4sIH2x")
+
+
+def decode(body: bytes) -> List[Measurement]:
+    """
+    Decodifica um lote empacotado com np.frombuffer (sem parse por campo nem
+    validação Pydantic por linha; os tipos já são garantidos pelo layout).
+    Levanta ValueError se o payload estiver malformado.
+    """
+    if len(body) < HEADER.size:
+        raise ValueError("payload shorter than header")
+    magic, n, n_channels = HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise ValueError("bad magic (expected LRM1)")
+    if n_channels != len(CHANNELS):
+        raise ValueError(f"expected {len(CHANNELS)} channels, got {n_channels}")
+    if n > PACKED_MAX_ROWS:
+        raise ValueError(f"too many rows ({n} > {PACKED_MAX_ROWS})")
+    expected = HEADER.size + n * (4 + 8 + 4 * n_channels)
+    if len(body) != expected:
+        raise ValueError(f"expected {expected} bytes for {n} rows, got {len(body)}")
+
+    offset = HEADER.size
+    bus_ids = np.frombuffer(body, dtype="<i4", count=n, offset=offset)
+    offset += 4 * n
+    ts_us = np.frombuffer(body, dtype="<i8", count=n, offset=offset)
+    offset += 8 * n
+    values = np.frombuffer(body, dtype="<i4", count=n * n_channels, offset=offset).reshape(n_channels, n)
+    if n and (ts_us.min() < 0 or ts_us.max() >= 253402300800 * 1_000_000):  # até 9999-12-31
+        raise ValueError("timestamp out of range")
+
+    # transposição e conversão em bloco; só as posições nulas são tocadas uma a uma
+    rows = values.T.tolist()
+    for i, j in zip(*np.nonzero(values.T == NULL_INT32)):
+        rows[i][j] = None
+    return [
+        Measurement.model_construct(
+            bus_id=bus_id, timestamp=_EPOCH + timedelta(microseconds=us), **dict(zip(CHANNELS, row))
+        )
+        for bus_id, us, row in zip(bus_ids.tolist(), ts_us.tolist(), rows)
+    ]
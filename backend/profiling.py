@@ -0,0 +1,254 @@
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import parse_qs
+
+PROFILING_ENABLED     = os.environ.get("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_TOKEN       = os.environ.get("PROFILING_TOKEN", "")
+PROFILE_INTERVAL_S    = float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000
+PROFILE_KEEP          = int(os.environ.get("PROFILE_KEEP", 20))
+PROFILE_DIR           = os.environ.get("PROFILE_DIR", "")
+
+# Ordem das fases no cabeçalho Server-Timing
+PHASES = ("db.connect", "db.execute", "db.fetch", "transform", "serialize", "framework")
+
+
+class Profile:
+    """
+    Perfil de uma requisição: amostrador estatístico (pilhas via
+    sys._current_frames a cada `interval_s`, no formato "folded" do
+    flamegraph.pl/speedscope) das threads que trabalham para ela, e os tempos
+    acumulados por fase (spans). A thread do event loop é sempre amostrada
+    (e pode incluir trabalho de requisições concorrentes); uma thread do
+    threadpool só é amostrada enquanto tem um span desta requisição aberto,
+    já que depois ela passa a atender outras requisições.
+    """
+
+    def __init__(self, method: str, path: str, interval_s: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.interval_s = interval_s
+        self.spans = Counter()
+        self.stacks = Counter()
+        self.samples = 0
+        self.total_ms = None
+        self._threads = Counter({threading.get_ident(): 1})   # thread -> spans abertos (loop: fixa)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+        self._t0 = time.perf_counter()
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+        self.total_ms = (time.perf_counter() - self._t0) * 1000
+
+    @contextmanager
+    def span(self, name: str):
+        tid = threading.get_ident()
+        with self._lock:
+            self._threads[tid] += 1
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.spans[name] += (time.perf_counter() - t0) * 1000
+                self._threads[tid] -= 1
+                if self._threads[tid] <= 0:
+                    del self._threads[tid]
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frames = sys._current_frames()
+            with self._lock:
+                for tid in self._threads:
+                    frame = frames.get(tid)
+                    if frame is not None:
+                        self.stacks[_fold(frame)] += 1
+                        self.samples += 1
+
+    def phases(self) -> dict:
+        """Tempos por fase: transform = crud - banco; framework = resto da requisição."""
+        s = self.spans
+        db = s["db.connect"] + s["db.execute"] + s["db.fetch"]
+        out = {
+            "db.connect": s["db.connect"], "db.execute": s["db.execute"], "db.fetch": s["db.fetch"],
+            "transform": max(0.0, s["crud"] - db) if "crud" in s else 0.0,
+            "serialize": s["serialize"],
+        }
+        if self.total_ms is not None:
+            out["framework"] = max(0.0, self.total_ms - (s["crud"] if "crud" in s else db) - s["serialize"])
+        return {k: round(v, 3) for k, v in out.items()}
+
+    def server_timing(self) -> str:
+        phases = self.phases()
+        parts = [f"{p.replace('.', '-')};dur={phases[p]}" for p in PHASES if phases.get(p)]
+        parts.append(f"total;dur={round(self.total_ms, 3)}")
+        return ", ".join(parts)
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id, "method": self.method, "path": self.path,
+            "total_ms": round(self.total_ms, 3), "samples": self.samples,
+            "interval_ms": self.interval_s * 1000, "phases_ms": self.phases(),
+        }
+
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+_active: ContextVar[Optional[Profile]] = ContextVar("profile", default=None)
+
+def current_profile() -> Optional[Profile]:
+    return _active.get()
+
+def span(name: str):
+    """Span da fase `name` no perfil da requisição atual (no-op sem perfil)."""
+    profile = _active.get()
+    return profile.span(name) if profile is not None else nullcontext()
+
+
+class TimedCursor:
+    """Cursor psycopg2 que mede execute (db.execute) e fetch* (db.fetch) no perfil ativo."""
+
+    def __init__(self, cursor, profile: Profile):
+        self._cursor = cursor
+        self._profile = profile
+
+    def execute(self, *args, **kwargs):
+        with self._profile.span("db.execute"):
+            return self._cursor.execute(*args, **kwargs)
+
+    def fetchone(self):
+        with self._profile.span("db.fetch"):
+            return self._cursor.fetchone()
+
+    def fetchmany(self, *args):
+        with self._profile.span("db.fetch"):
+            return self._cursor.fetchmany(*args)
+
+    def fetchall(self):
+        with self._profile.span("db.fetch"):
+            return self._cursor.fetchall()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+
+class ProfileStore:
+    """Últimos PROFILE_KEEP perfis em memória (e em PROFILE_DIR, se configurado)."""
+
+    def __init__(self, keep: int, directory: str = ""):
+        self.keep = keep
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def add(self, profile: Profile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+        if self.directory:
+            base = os.path.join(self.directory, profile.id)
+            with open(base + ".folded", "w", encoding="utf-8") as f:
+                f.write(profile.folded())
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump(profile.summary(), f, indent=2)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return [p.summary() for p in reversed(self._profiles.values())]
+
+
+store = ProfileStore(PROFILE_KEEP, PROFILE_DIR)
+
+
+def authorized(headers: dict) -> bool:
+    # sem token configurado ninguém perfila, mesmo com PROFILING_ENABLED
+    if not PROFILING_ENABLED or not PROFILING_TOKEN:
+        return False
+    return hmac.compare_digest(headers.get("x-profile-token", ""), PROFILING_TOKEN)
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI: com PROFILING_ENABLED, PROFILING_TOKEN definido e o token
+    certo (X-Profile-Token), uma requisição com `X-Profile: 1` ou `?profile=1`
+    roda sob o amostrador.
+    A resposta leva Server-Timing com as fases e X-Profile-Id; o perfil
+    (pilhas folded + fases) fica em GET /profiles/{id}.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        wanted = headers.get("x-profile") == "1" or parse_qs(scope["query_string"].decode()).get("profile") == ["1"]
+        if not wanted or not authorized(headers):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], PROFILE_INTERVAL_S)
+        token = _active.set(profile)
+        profile.start()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                profile.stop()
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"server-timing", profile.server_timing().encode()),
+                    (b"x-profile-id", profile.id.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _active.reset(token)
+            if profile.total_ms is None:
+                profile.stop()
+            store.add(profile)
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Hashable, Iterable, Optional
+
+from db import REPLICA_ENABLED, REPLICA_MAX_LAG_S
+
+RESULT_CACHE_ENABLED     = os.environ.get("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_MAX_MB      = float(os.environ.get("RESULT_CACHE_MAX_MB", 64))
+RESULT_CACHE_DIR         = os.environ.get("RESULT_CACHE_DIR", "")
+RESULT_CACHE_DISK_MAX_MB = float(os.environ.get("RESULT_CACHE_DISK_MAX_MB", 1024))
+RESULT_CACHE_SETTLE_S    = float(os.environ.get("RESULT_CACHE_SETTLE_S", 3600))
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+class _Entry:
+    __slots__ = ("bus_ids", "start", "end", "size")
+
+    def __init__(self, bus_ids, start: float, end: float, size: int):
+        self.bus_ids = frozenset(bus_ids)
+        self.start = start
+        self.end = end
+        self.size = size
+
+    def overlaps(self, bus_id: int, start: float, end: float) -> bool:
+        return bus_id in self.bus_ids and self.start <= end and start <= self.end
+
+
+class ResultCache:
+    """
+    Cache LRU de respostas já serializadas (JSON em bytes) para consultas cujo
+    intervalo terminou há mais que `settle_s` — dados que não mudam mais após a
+    ingestão assentar. Camada em memória limitada em bytes e, opcionalmente,
+    uma camada em disco (um arquivo por entrada + metadados), também LRU.
+    Entradas são invalidadas quando deletes ou backfills tocam sua janela.
+
+    Só as escritas que passam por este processo invalidam sozinhas; quem grava
+    direto no banco (backfill, coletor main.py, drop_chunks) precisa chamar
+    POST /cache/invalidate. A camada em disco é esvaziada ao iniciar: o que
+    mudou no banco com o backend parado não teria invalidado nada.
+    """
+
+    def __init__(self, max_bytes: int, settle_s: float, disk_dir: str = "", disk_max_bytes: int = 0,
+                 stale_window_s: float = 0):
+        self.max_bytes = max_bytes
+        self.settle_s = settle_s
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()     # digest -> (_Entry, body)
+        self._disk: "OrderedDict[str, _Entry]" = OrderedDict()   # digest -> _Entry
+        self._mem_bytes = 0
+        self._disk_bytes = 0
+        # incrementado a cada invalidação: resultados calculados/lidos antes dela
+        # não podem ser (re)inseridos depois
+        self.generation = 0
+        # leituras da réplica podem não enxergar uma escrita por até `stale_window_s`:
+        # nesse período após invalidar um barramento, nada dele é armazenado
+        self.stale_window_s = stale_window_s
+        self._invalidated_at = {}   # bus_id -> time.monotonic()
+        self.stats = {
+            "hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0,
+            "stores": 0, "evictions": 0, "invalidations": 0,
+        }
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._clear_disk()
+
+    def cacheable(self, end: datetime) -> bool:
+        return _utc(end) < datetime.now(timezone.utc) - timedelta(seconds=self.settle_s)
+
+    # — leitura/escrita —
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        digest = _digest(key)
+        with self._lock:
+            hit = self._mem.get(digest)
+            if hit is not None:
+                self._mem.move_to_end(digest)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return hit[1]
+            entry = self._disk.get(digest)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._disk.move_to_end(digest)
+            generation = self.generation
+        try:
+            with open(self._path(digest, "bin"), "rb") as f:
+                body = f.read()
+        except OSError:
+            with self._lock:
+                self._drop_disk(digest)
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            if generation != self.generation:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+            self._put_mem(digest, entry, body)
+        return body
+
+    def put(self, key: Hashable, body: bytes, bus_ids: Iterable[int], start: datetime, end: datetime,
+            generation: Optional[int] = None):
+        """
+        Armazena uma resposta. `generation` é o valor de `self.generation` lido
+        antes de calcular o resultado; se houve invalidação desde então, descarta.
+        """
+        digest = _digest(key)
+        entry = _Entry(bus_ids, _utc(start).timestamp(), _utc(end).timestamp(), len(body))
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if self.stale_window_s and any(
+                time.monotonic() - self._invalidated_at.get(b, float("-inf")) < self.stale_window_s
+                for b in entry.bus_ids
+            ):
+                return
+            self.stats["stores"] += 1
+            self._put_mem(digest, entry, body)
+            generation = self.generation
+        if self.disk_dir and len(body) <= self.disk_max_bytes:
+            self._put_disk(digest, entry, body, generation)
+
+    def invalidate(self, bus_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+        """Remove as entradas do barramento cuja janela se sobrepõe a [start, end] (None = aberto)."""
+        lo = _utc(start).timestamp() if start else float("-inf")
+        hi = _utc(end).timestamp() if end else float("inf")
+        with self._lock:
+            mem = [d for d, (e, _) in self._mem.items() if e.overlaps(bus_id, lo, hi)]
+            disk = [d for d, e in self._disk.items() if e.overlaps(bus_id, lo, hi)]
+            for d in mem:
+                self._mem_bytes -= self._mem.pop(d)[0].size
+            for d in disk:
+                self._drop_disk(d)
+            removed = len(set(mem) | set(disk))
+            self.stats["invalidations"] += removed
+            self.generation += 1
+            if self.stale_window_s:
+                self._invalidated_at[bus_id] = time.monotonic()
+        return removed
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else None,
+                "memory_entries": len(self._mem),
+                "memory_bytes": self._mem_bytes,
+                "memory_max_bytes": self.max_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes if self.disk_dir else 0,
+                "settle_s": self.settle_s,
+            }
+
+    # — internos (chamados com _lock, exceto _put_disk) —
+
+    def _put_mem(self, digest, entry, body):
+        if len(body) > self.max_bytes:
+            return
+        old = self._mem.pop(digest, None)
+        if old is not None:
+            self._mem_bytes -= old[0].size
+        self._mem[digest] = (entry, body)
+        self._mem_bytes += entry.size
+        while self._mem_bytes > self.max_bytes:
+            _, (evicted, _) = self._mem.popitem(last=False)
+            self._mem_bytes -= evicted.size
+            self.stats["evictions"] += 1
+
+    def _put_disk(self, digest, entry, body, generation):
+        meta = {"bus_ids": sorted(entry.bus_ids), "start": entry.start, "end": entry.end}
+        try:
+            tmp = self._path(digest, "tmp")
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, self._path(digest, "bin"))
+            with open(self._path(digest, "json"), "w") as f:
+                json.dump(meta, f)
+        except OSError as e:
+            print(f"[resultcache] disk write failed: {e}")
+            return
+        with self._lock:
+            if digest in self._disk:
+                self._disk_bytes -= self._disk.pop(digest).size
+            if generation != self.generation:
+                # invalidado enquanto gravava: não publica a entrada
+                self._drop_disk(digest)
+                return
+            self._disk[digest] = entry
+            self._disk_bytes += entry.size
+            while self._disk_bytes > self.disk_max_bytes and self._disk:
+                self._drop_disk(next(iter(self._disk)))
+
+    def _drop_disk(self, digest):
+        entry = self._disk.pop(digest, None)
+        if entry is not None:
+            self._disk_bytes -= entry.size
+        for ext in ("bin", "json"):
+            try:
+                os.remove(self._path(digest, ext))
+            except OSError:
+                pass
+
+    def _clear_disk(self):
+        for name in os.listdir(self.disk_dir):
+            if name.endswith((".bin", ".json", ".tmp")):
+                try:
+                    os.remove(os.path.join(self.disk_dir, name))
+                except OSError:
+                    pass
+
+    def _path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.disk_dir, f"{digest}.{ext}")
+
+
+def _digest(key: Hashable) -> str:
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+# Instância única do processo
+cache = ResultCache(
+    int(RESULT_CACHE_MAX_MB * 1024 * 1024),
+    RESULT_CACHE_SETTLE_S,
+    RESULT_CACHE_DIR,
+    int(RESULT_CACHE_DISK_MAX_MB * 1024 * 1024),
+    REPLICA_MAX_LAG_S if REPLICA_ENABLED else 0,
+)
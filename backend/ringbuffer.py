@@ -0,0 +1,282 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from db import get_db_conn
+from models import Measurement
+
+RING_BUFFER_ENABLED  = os.environ.get("RING_BUFFER_ENABLED", "true").lower() == "true"
+RING_BUFFER_MINUTES  = int(os.environ.get("RING_BUFFER_MINUTES", 60))
+RING_BUFFER_CAPACITY = int(os.environ.get("RING_BUFFER_CAPACITY", 8192))
+# Intervalo máximo sem buscar no banco linhas gravadas fora do backend (coletor, COPY)
+RING_BUFFER_SYNC_S   = float(os.environ.get("RING_BUFFER_SYNC_MS", 500)) / 1000
+
+CHANNELS = tuple(Measurement.model_fields.keys())[2:]
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_us(ts: datetime) -> int:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (ts - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_us(us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=us)
+
+
+class BusRing:
+    """
+    Janela recente de um barramento em arrays NumPy de tamanho fixo: timestamps
+    (µs desde a época, int64), canais int32 e máscara de nulos. As linhas ficam
+    em ordem de timestamp numa fila circular. `covered_from` é o instante a
+    partir do qual o buffer tem *todas* as linhas do barramento; antes de
+    aquecido (ou após invalidação) ele é None e nada é respondido daqui.
+    `epoch` conta as invalidações: uma carga lida do banco antes de uma
+    invalidação não pode ser aplicada depois dela.
+    """
+
+    def __init__(self, capacity: int):
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, len(CHANNELS)), dtype=np.int32)
+        self.nulls = np.zeros((capacity, len(CHANNELS)), dtype=bool)
+        self.start = 0      # índice da linha mais antiga
+        self.size = 0
+        self.covered_from: Optional[int] = None
+        self.epoch = 0
+        self.synced_at = float("-inf")   # time.monotonic() da última busca no banco
+
+    # — escrita —
+
+    def append(self, ts_us: int, row, nulls):
+        if self.size and ts_us <= self.ts[(self.start + self.size - 1) % self.capacity]:
+            self._insert_out_of_order(ts_us, row, nulls)
+            return
+        if self.size == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+            self.size -= 1
+            if self.covered_from is not None:
+                self.covered_from = max(self.covered_from, int(self.ts[self.start]))
+        i = (self.start + self.size) % self.capacity
+        self.ts[i], self.values[i], self.nulls[i] = ts_us, row, nulls
+        self.size += 1
+
+    def _insert_out_of_order(self, ts_us, row, nulls):
+        # raro (coletor atrasado): reordena tudo e reaproveita o caminho de carga
+        ts, values, null = self._ordered()
+        self.load(
+            np.append(ts, ts_us), np.vstack([values, row]), np.vstack([null, nulls]),
+            self.covered_from
+        )
+
+    def load(self, ts, values, nulls, covered_from: Optional[int]):
+        """Substitui o conteúdo (ordenando, sem duplicatas e limitado à capacidade)."""
+        order = np.argsort(ts, kind="stable")
+        ts, values, nulls = ts[order], values[order], nulls[order]
+        # mantém a última versão de cada timestamp
+        keep = np.append(ts[1:] != ts[:-1], True) if len(ts) else np.zeros(0, dtype=bool)
+        ts, values, nulls = ts[keep], values[keep], nulls[keep]
+        if len(ts) > self.capacity:
+            ts, values, nulls = ts[-self.capacity:], values[-self.capacity:], nulls[-self.capacity:]
+            if covered_from is not None:
+                covered_from = max(covered_from, int(ts[0]))
+        n = len(ts)
+        self.ts[:n], self.values[:n], self.nulls[:n] = ts, values, nulls
+        self.start, self.size = 0, n
+        self.covered_from = covered_from
+
+    # — leitura —
+
+    def _ordered(self):
+        idx = (self.start + np.arange(self.size)) % self.capacity
+        return self.ts[idx], self.values[idx], self.nulls[idx]
+
+    def since(self, since_us: int):
+        """Linhas com ts >= since_us, ou None se o buffer não cobre a janela."""
+        if self.covered_from is None or since_us < self.covered_from:
+            return None
+        ts, values, nulls = self._ordered()
+        k = np.searchsorted(ts, since_us, side="left")
+        return ts[k:], values[k:], nulls[k:]
+
+    def last(self, n: int):
+        """As N linhas mais recentes, ou None se o buffer tem menos que N."""
+        if self.covered_from is None or self.size < n:
+            return None
+        ts, values, nulls = self._ordered()
+        return ts[-n:], values[-n:], nulls[-n:]
+
+
+class RingBufferStore:
+    """
+    Buffers por barramento mantidos pelo processo do backend. O caminho de
+    inserção alimenta os buffers e o startup os aquece a partir do banco;
+    consultas lastn/lastminutes cuja janela cabe no buffer não vão ao Postgres.
+    Linhas gravadas direto no banco (coletor main.py, COPY) entram pela
+    sincronização: antes de responder, se a última busca tem mais de `sync_s`,
+    uma consulta indexada traz só as linhas mais novas que o buffer (em geral
+    poucas, do chunk mais recente). Updates/deletes e cargas de dados antigos
+    feitos fora da API precisam de POST /cache/invalidate (o backfill chama).
+    """
+
+    def __init__(self, minutes: int, capacity: int, sync_s: float = 0):
+        self.minutes = minutes
+        self.capacity = capacity
+        self.sync_s = sync_s
+        self._lock = threading.Lock()
+        self._rings: Dict[int, BusRing] = {}
+
+    def _ring(self, bus_id: int) -> BusRing:
+        with self._lock:
+            ring = self._rings.get(bus_id)
+            if ring is None:
+                ring = self._rings[bus_id] = BusRing(self.capacity)
+            return ring
+
+    def append(self, ms: List[Measurement]):
+        for m in ms:
+            ring = self._ring(m.bus_id)
+            row = [getattr(m, c) for c in CHANNELS]
+            nulls = np.array([v is None for v in row])
+            values = np.array([0 if v is None else v for v in row], dtype=np.int32)
+            with ring.lock:
+                ring.append(_to_us(m.timestamp), values, nulls)
+
+    def invalidate(self, bus_id: int):
+        """Esvazia o buffer do barramento (após update/delete); reaquece sob demanda."""
+        ring = self._ring(bus_id)
+        with ring.lock:
+            ring.start, ring.size = 0, 0
+            ring.covered_from = None
+            ring.epoch += 1
+
+    def warm(self, bus_ids: Optional[List[int]] = None):
+        """Carrega os últimos RING_BUFFER_MINUTES do banco (todos os barramentos por padrão)."""
+        since = datetime.now(timezone.utc) - timedelta(minutes=self.minutes)
+        conn = get_db_conn()
+        with conn.cursor() as cur:
+            if bus_ids is None:
+                cur.execute("SELECT bus_number FROM buses;")
+                bus_ids = [r[0] for r in cur.fetchall()]
+            epochs = {}
+            read_at = time.monotonic()
+            for bus_id in bus_ids:
+                ring = self._ring(bus_id)
+                with ring.lock:
+                    epochs[bus_id] = ring.epoch
+            cur.execute(f"""
+                SELECT bus_id, timestamp, {', '.join(CHANNELS)}
+                  FROM measurements
+                 WHERE bus_id = ANY(%s) AND timestamp >= %s
+                 ORDER BY bus_id, timestamp;
+            """, (list(bus_ids), since))
+            rows = cur.fetchall()
+        conn.close()
+
+        by_bus: Dict[int, list] = {b: [] for b in bus_ids}
+        for r in rows:
+            by_bus[r[0]].append(r)
+        since_us = _to_us(since)
+        for bus_id, bus_rows in by_bus.items():
+            ts, values, nulls = _to_arrays(bus_rows)
+            ring = self._ring(bus_id)
+            with ring.lock:
+                if ring.epoch != epochs[bus_id]:
+                    # invalidado durante a leitura: a carga pode ter linhas já
+                    # alteradas/apagadas; fica frio e reaquece na próxima consulta
+                    continue
+                # une com o que chegou pelo caminho de inserção durante a carga;
+                # no mesmo timestamp vale a versão do banco (load mantém a última)
+                cur_ts, cur_values, cur_nulls = ring._ordered()
+                ring.load(
+                    np.concatenate([cur_ts, ts]),
+                    np.vstack([cur_values, values]),
+                    np.vstack([cur_nulls, nulls]),
+                    since_us
+                )
+                ring.synced_at = read_at
+
+    def sync(self, bus_id: int):
+        """Traz do banco as linhas do barramento mais novas que o buffer."""
+        ring = self._ring(bus_id)
+        with ring.lock:
+            now = time.monotonic()
+            if ring.covered_from is None or now - ring.synced_at < self.sync_s:
+                return
+            ring.synced_at = now   # reserva: leituras concorrentes não repetem a busca
+            epoch = ring.epoch
+            newest = int(ring.ts[(ring.start + ring.size - 1) % ring.capacity]) if ring.size else ring.covered_from
+        conn = get_db_conn()
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT bus_id, timestamp, {', '.join(CHANNELS)}
+                  FROM measurements
+                 WHERE bus_id = %s AND timestamp > %s
+                 ORDER BY timestamp;
+            """, (bus_id, _from_us(newest)))
+            rows = cur.fetchall()
+        conn.close()
+        if not rows:
+            return
+        ts, values, nulls = _to_arrays(rows)
+        with ring.lock:
+            if ring.epoch != epoch:
+                return
+            for i in range(len(ts)):
+                ring.append(int(ts[i]), values[i], nulls[i])
+
+    def since(self, bus_id: int, since: datetime) -> Optional[List[dict]]:
+        return self._read(bus_id, lambda ring: ring.since(_to_us(since)))
+
+    def last_n(self, bus_id: int, n: int) -> Optional[List[dict]]:
+        return self._read(bus_id, lambda ring: ring.last(n))
+
+    def _read(self, bus_id: int, select):
+        ring = self._ring(bus_id)
+        with ring.lock:
+            cold = ring.covered_from is None
+        if cold:
+            self.warm([bus_id])
+        else:
+            self.sync(bus_id)
+        with ring.lock:
+            found = select(ring)
+            if found is None:
+                return None
+            ts, values, nulls = (a.copy() for a in found)
+        return _to_dicts(bus_id, ts, values, nulls)
+
+
+def _to_arrays(rows):
+    """Linhas (bus_id, timestamp, canais...) do banco -> (ts, values, nulls)."""
+    ts = np.array([_to_us(r[1]) for r in rows], dtype=np.int64)
+    raw = [r[2:] for r in rows]
+    nulls = np.array([[v is None for v in r] for r in raw], dtype=bool).reshape(-1, len(CHANNELS))
+    values = np.array([[0 if v is None else v for v in r] for r in raw],
+                      dtype=np.int32).reshape(-1, len(CHANNELS))
+    return ts, values, nulls
+
+
+def _to_dicts(bus_id: int, ts, values, nulls) -> List[dict]:
+    cols = [
+        [None if isnull else v for v, isnull in zip(values[:, j].tolist(), nulls[:, j].tolist())]
+        if nulls[:, j].any() else values[:, j].tolist()
+        for j in range(len(CHANNELS))
+    ]
+    out = []
+    for i, t in enumerate(ts.tolist()):
+        row = {"bus_id": bus_id, "timestamp": _from_us(t)}
+        for j, c in enumerate(CHANNELS):
+            row[c] = cols[j][i]
+        out.append(row)
+    return out
+
+
+# Instância única do processo
+store = RingBufferStore(RING_BUFFER_MINUTES, RING_BUFFER_CAPACITY, RING_BUFFER_SYNC_S)
@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+SINGLEFLIGHT_TTL_MS = float(os.environ.get("SINGLEFLIGHT_TTL_MS", 0))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+        self.scope = None
+
+
+class SingleFlight:
+    """
+    Coalescência de requisições idênticas concorrentes: para uma mesma chave,
+    só a primeira chamada (líder) executa `fn`; as que chegam enquanto ela está
+    em andamento esperam e recebem o mesmo resultado (ou a mesma exceção).
+    Com `ttl_s` > 0 o resultado ainda é reaproveitado por esse tempo após
+    terminar, absorvendo rajadas que não chegaram a se sobrepor.
+    `scope` (deadline.QueryScope da requisição) liga as caronas à consulta do
+    líder: ela só é cancelada quando todos os clientes interessados desistem.
+    """
+
+    def __init__(self, ttl_s: float = 0.0):
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._recent: Dict[Hashable, Tuple[float, Any]] = {}
+        self.stats = {"executed": 0, "shared": 0, "ttl_hits": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], scope=None) -> Any:
+        with self._lock:
+            if self.ttl_s:
+                hit = self._recent.get(key)
+                if hit is not None and hit[0] > time.monotonic():
+                    self.stats["ttl_hits"] += 1
+                    return hit[1]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                call.scope = scope
+                self.stats["executed"] += 1
+            else:
+                call.waiters += 1
+                self.stats["shared"] += 1
+                if scope is not None and call.scope is not None:
+                    scope.share(call.scope)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if self.ttl_s and call.error is None:
+                    now = time.monotonic()
+                    self._recent = {k: v for k, v in self._recent.items() if v[0] > now}
+                    self._recent[key] = (now + self.ttl_s, call.value)
+            call.done.set()
+
+
+# Instância única do processo
+flight = SingleFlight(SINGLEFLIGHT_TTL_MS / 1000.0)
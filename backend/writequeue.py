@@ -0,0 +1,127 @@
+import os
+import queue
+import threading
+import time
+from typing import Callable, List
+
+import psycopg2
+
+from db import get_db_conn
+from models import Measurement
+
+WRITE_QUEUE_ENABLED      = os.environ.get("WRITE_QUEUE_ENABLED", "false").lower() == "true"
+WRITE_QUEUE_MAX_BATCH    = int(os.environ.get("WRITE_QUEUE_MAX_BATCH", 500))
+WRITE_QUEUE_MAX_DELAY_MS = float(os.environ.get("WRITE_QUEUE_MAX_DELAY_MS", 5))
+
+
+class _Pending:
+    __slots__ = ("m", "done", "error")
+
+    def __init__(self, m: Measurement):
+        self.m = m
+        self.done = threading.Event()
+        self.error = None
+
+
+class WriteQueue:
+    """
+    Group commit para POSTs de uma linha: cada chamada enfileira a medição e
+    bloqueia; um escritor em segundo plano junta o que chegou em até
+    `max_delay_ms` (ou `max_batch` linhas) e grava tudo numa única transação,
+    ou seja, um fsync de WAL por lote em vez de um por linha. A chamada só
+    retorna depois do commit do seu lote (ack durável) ou com o erro da sua
+    linha. Se o lote falha (ex.: PK duplicada), as linhas são regravadas uma a
+    uma para que só a linha culpada receba o erro.
+
+    Os chamadores esperando ocupam threads do threadpool: o ganho depende de
+    haver várias escritas simultâneas (ver WRITE_MAX_CONCURRENCY em admission.py).
+    """
+
+    def __init__(self, insert: Callable, on_commit: Callable[[List[Measurement]], None],
+                 max_batch: int, max_delay_ms: float):
+        self._insert = insert
+        self._on_commit = on_commit
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._conn = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {"rows": 0, "batches": 0, "fallback_batches": 0, "errors": 0}
+
+    def submit(self, m: Measurement):
+        self._ensure_started()
+        p = _Pending(m)
+        self._queue.put(p)
+        p.done.wait()
+        if p.error is not None:
+            raise p.error
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _connection(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = get_db_conn()
+        return self._conn
+
+    def _flush(self, batch: List[_Pending]):
+        committed = []
+        try:
+            conn = self._connection()
+            try:
+                with conn.cursor() as cur:
+                    self._insert(cur, [p.m for p in batch])
+                conn.commit()
+                committed = batch
+            except psycopg2.Error:
+                conn.rollback()
+                self.stats["fallback_batches"] += 1
+                committed = self._flush_one_by_one(conn, batch)
+        except Exception as e:
+            # conexão perdida etc.: falha o lote inteiro e reconecta no próximo
+            self._conn = None
+            for p in batch:
+                if p.error is None and p not in committed:
+                    p.error = e
+        self.stats["batches"] += 1
+        self.stats["rows"] += len(committed)
+        self.stats["errors"] += len(batch) - len(committed)
+        if committed:
+            try:
+                self._on_commit([p.m for p in committed])
+            except Exception as e:
+                print(f"[writequeue] post-commit hook failed: {e}")
+        for p in batch:
+            p.done.set()
+
+    def _flush_one_by_one(self, conn, batch: List[_Pending]) -> List[_Pending]:
+        committed = []
+        for p in batch:
+            try:
+                with conn.cursor() as cur:
+                    self._insert(cur, [p.m])
+                conn.commit()
+                committed.append(p)
+            except psycopg2.Error as e:
+                conn.rollback()
+                p.error = e
+        return committed
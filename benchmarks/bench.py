@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ponta a ponta da API (ingestão + consultas) contra a stack local
+do docker-compose.
+
+Uso:
+    python bench.py run --mix ingest=4,bulk=1,snapshot=2,lastn=4,range=2,lasthours=1 \\
+                        --concurrency 1,2,4,8,16,32 --duration 20
+    python bench.py compare results/old.json results/new.json
+
+Cada degrau de concorrência roda `--duration` segundos com N threads clientes
+sorteando operações segundo os pesos de `--mix`. O resultado (vazão, p50/p95/p99
+por operação e CPU do container do Postgres) é gravado em JSON em `--out`,
+nomeado pelo commit atual, para comparar regressões entre commits.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+API_URL = os.environ.get("API_URL", "http://localhost:8000")
+DB_CONTAINER = os.environ.get("DB_CONTAINER", "postgres")
+
+DEFAULT_MIX = "ingest=4,bulk=1,snapshot=2,lastn=4,range=2,lasthours=1"
+OPERATIONS = ("ingest", "bulk", "snapshot", "lastn", "range", "lasthours")
+
+
+# ————— Carga —————
+
+class Clock:
+    """Gera timestamps únicos e crescentes (resolução de 1 µs) para a PK (bus_id, timestamp)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = 0
+
+    def next(self, n: int = 1):
+        with self._lock:
+            now = int(time.time() * 1_000_000)
+            first = max(now, self._last + 1)
+            self._last = first + n - 1
+        return [
+            datetime.fromtimestamp((first + i) / 1_000_000, tz=timezone.utc).isoformat()
+            for i in range(n)
+        ]
+
+
+def make_payload(bus_id: int, ts: str):
+    """Mesma faixa de valores do coletor dummy (modbus_collector/test.py)."""
+    r = random.randint
+    return {
+        "bus_id": bus_id, "timestamp": ts,
+        "freq_a": r(48, 52), "freq_b": r(48, 52), "freq_c": r(48, 52),
+        "va_rms": r(210, 230), "vb_rms": r(210, 230), "vc_rms": r(210, 230),
+        "ia_rms": r(0, 100), "ib_rms": r(0, 100), "ic_rms": r(0, 100),
+        "pa": r(0, 2000), "pb": r(0, 2000), "pc": r(0, 2000),
+        "sa": r(0, 2500), "sb": r(0, 2500), "sc": r(0, 2500),
+        "qa": r(-500, 500), "qb": r(-500, 500), "qc": r(-500, 500),
+        "pfa": r(950, 1000), "pfb": r(950, 1000), "pfc": r(950, 1000),
+        "va_p": r(240, 260), "vb_p": r(240, 260), "vc_p": r(240, 260),
+        "va_th": r(0, 360), "vb_th": r(0, 360), "vc_th": r(0, 360),
+        "ia_p": r(0, 150), "ib_p": r(0, 150), "ic_p": r(0, 150),
+        "ia_th": r(0, 360), "ib_th": r(0, 360), "ic_th": r(0, 360),
+    }
+
+
+class Workload:
+    """Executa uma operação da mistura e retorna a resposta HTTP."""
+
+    def __init__(self, api_url: str, buses, clock: Clock, args):
+        self.api_url = api_url
+        self.buses = buses
+        self.clock = clock
+        self.args = args
+
+    def run(self, op: str, session: requests.Session):
+        bus = random.choice(self.buses)
+        base = f"{self.api_url}/buses/{bus}/measurements"
+        if op == "ingest":
+            ts, = self.clock.next()
+            return session.post(base, json=make_payload(bus, ts))
+        if op == "bulk":
+            rows = [make_payload(bus, ts) for ts in self.clock.next(self.args.bulk_size)]
+            return session.post(f"{base}/bulk", json=rows)
+        if op == "snapshot":
+            # igual ao painel: última medida de todos os barramentos
+            resp = None
+            for b in self.buses:
+                resp = session.get(f"{self.api_url}/buses/{b}/measurements/last")
+                if resp.status_code not in (200, 404):
+                    return resp
+            return resp
+        if op == "lastn":
+            return session.get(f"{base}/lastn", params={"n": self.args.lastn})
+        if op == "range":
+            end = datetime.now(timezone.utc) - timedelta(minutes=random.randint(0, 60))
+            start = end - timedelta(minutes=self.args.range_minutes)
+            return session.get(f"{base}/range", params={
+                "start": start.isoformat(), "end": end.isoformat(), "limit": 10000
+            })
+        if op == "lasthours":
+            return session.get(f"{base}/lasthours", params={"hours": self.args.hours})
+        raise ValueError(f"Unknown operation '{op}'")
+
+
+# ————— Métricas —————
+
+def percentile(sorted_values, q: float):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class CpuSampler(threading.Thread):
+    """Amostra a CPU do container do Postgres via `docker stats` enquanto o degrau roda."""
+
+    def __init__(self, container: str, interval: float = 1.0):
+        super().__init__(daemon=True)
+        self.container = container
+        self.interval = interval
+        self.samples = []
+        self.error = None
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                out = subprocess.run(
+                    ["docker", "stats", "--no-stream", "--format", "{{.CPUPerc}}", self.container],
+                    capture_output=True, text=True, timeout=10, check=True
+                ).stdout.strip()
+                self.samples.append(float(out.rstrip("%")))
+            except (OSError, subprocess.SubprocessError, ValueError) as e:
+                self.error = str(e)
+                return
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+        self.join(timeout=15)
+
+    def summary(self):
+        if not self.samples:
+            return {"mean": None, "max": None, "samples": 0, "error": self.error}
+        return {
+            "mean": round(sum(self.samples) / len(self.samples), 2),
+            "max": max(self.samples),
+            "samples": len(self.samples),
+            "error": self.error,
+        }
+
+
+def run_step(workload: Workload, mix, concurrency: int, duration: float, db_container: str):
+    ops, weights = zip(*mix.items())
+    results = {op: [] for op in ops}
+    errors = {op: 0 for op in ops}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        local = {op: [] for op in ops}
+        local_err = {op: 0 for op in ops}
+        while time.perf_counter() < deadline:
+            op = random.choices(ops, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                resp = workload.run(op, session)
+                ok = resp is not None and (
+                    resp.status_code < 400 or (op == "snapshot" and resp.status_code == 404)
+                )
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - t0
+            if ok:
+                local[op].append(elapsed)
+            else:
+                local_err[op] += 1
+        with lock:
+            for op in ops:
+                results[op].extend(local[op])
+                errors[op] += local_err[op]
+
+    sampler = CpuSampler(db_container)
+    sampler.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    sampler.stop()
+
+    step = {"concurrency": concurrency, "duration_s": round(wall, 3), "ops": {}}
+    total = 0
+    for op in ops:
+        lat = sorted(results[op])
+        total += len(lat)
+        step["ops"][op] = {
+            "count": len(lat),
+            "errors": errors[op],
+            "throughput_rps": round(len(lat) / wall, 2),
+            "p50_ms": _ms(percentile(lat, 0.50)),
+            "p95_ms": _ms(percentile(lat, 0.95)),
+            "p99_ms": _ms(percentile(lat, 0.99)),
+        }
+    step["throughput_rps"] = round(total / wall, 2)
+    step["db_cpu_percent"] = sampler.summary()
+    return step
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+# ————— CLI —————
+
+def parse_mix(text: str):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation '{name}' (valid: {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return {k: v for k, v in mix.items() if v > 0}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def cmd_run(args):
+    mix = parse_mix(args.mix)
+    buses = [int(b) for b in args.buses.split(",")] if args.buses else [
+        b["bus_number"] for b in requests.get(f"{args.api_url}/buses").json()
+    ]
+    workload = Workload(args.api_url, buses, Clock(), args)
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "label": args.label,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "api_url": args.api_url,
+            "db_container": args.db_container,
+            "mix": mix,
+            "buses": buses,
+            "duration_s": args.duration,
+            "bulk_size": args.bulk_size,
+        },
+        "steps": [],
+    }
+    for c in [int(x) for x in args.concurrency.split(",")]:
+        print(f"[bench] concurrency={c} duration={args.duration}s ...")
+        step = run_step(workload, mix, c, args.duration, args.db_container)
+        report["steps"].append(step)
+        print(f"[bench]   {step['throughput_rps']} req/s, db cpu {step['db_cpu_percent']['mean']}%")
+        for op, s in step["ops"].items():
+            print(f"[bench]   {op:<10} {s['throughput_rps']:>9} req/s  "
+                  f"p50={s['p50_ms']}ms p95={s['p95_ms']}ms p99={s['p99_ms']}ms err={s['errors']}")
+
+    os.makedirs(args.out, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    name = f"{stamp}_{commit}" + (f"_{args.label}" if args.label else "") + ".json"
+    path = os.path.join(args.out, name)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[bench] results written to {path}")
+
+
+def cmd_compare(args):
+    with open(args.baseline) as f:
+        base = json.load(f)
+    with open(args.candidate) as f:
+        cand = json.load(f)
+    print(f"baseline:  {base['meta']['commit']} ({args.baseline})")
+    print(f"candidate: {cand['meta']['commit']} ({args.candidate})")
+    base_steps = {s["concurrency"]: s for s in base["steps"]}
+    regressions = 0
+    for step in cand["steps"]:
+        old = base_steps.get(step["concurrency"])
+        if old is None:
+            continue
+        print(f"\nconcurrency={step['concurrency']}")
+        for op, s in step["ops"].items():
+            o = old["ops"].get(op)
+            if not o:
+                continue
+            d_tp = _delta(o["throughput_rps"], s["throughput_rps"])
+            d_p95 = _delta(o["p95_ms"], s["p95_ms"])
+            flag = ""
+            if (d_tp is not None and d_tp < -args.threshold) or (d_p95 is not None and d_p95 > args.threshold):
+                flag = "  <-- REGRESSION"
+                regressions += 1
+            print(f"  {op:<10} rps {o['throughput_rps']} -> {s['throughput_rps']} ({_fmt(d_tp)})"
+                  f"  p95 {o['p95_ms']} -> {s['p95_ms']} ms ({_fmt(d_p95)}){flag}")
+    return 1 if regressions else 0
+
+
+def _delta(old, new):
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def _fmt(d):
+    return "n/a" if d is None else f"{d:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LabREI API load benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run the benchmark and store results as JSON")
+    run.add_argument("--api-url", default=API_URL)
+    run.add_argument("--mix", default=DEFAULT_MIX, help="weighted operations, e.g. ingest=4,lastn=2")
+    run.add_argument("--concurrency", default="1,2,4,8,16,32", help="comma separated client counts")
+    run.add_argument("--duration", type=float, default=20, help="seconds per concurrency step")
+    run.add_argument("--buses", default="", help="comma separated bus numbers (default: GET /buses)")
+    run.add_argument("--bulk-size", type=int, default=100, help="rows per bulk ingest request")
+    run.add_argument("--lastn", type=int, default=100)
+    run.add_argument("--range-minutes", type=int, default=60)
+    run.add_argument("--hours", type=int, default=24)
+    run.add_argument("--db-container", default=DB_CONTAINER)
+    run.add_argument("--label", default="")
+    run.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"))
+    run.set_defaults(func=cmd_run)
+
+    cmp_ = sub.add_parser("compare", help="compare two result files")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("candidate")
+    cmp_.add_argument("--threshold", type=float, default=10.0,
+                      help="percent change flagged as regression")
+    cmp_.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    raise SystemExit(args.func(args) or 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Compara a busca "últimas N" sem limite de tempo (ORDER BY timestamp DESC LIMIT n)
+com a busca adaptativa por janela de `backend/crud.py` direto no banco.
+
+Rodar sobre um banco com meses de dados (ver generate_history.py):
+    python generate_history.py --days 180 --interval 5
+    python bench_lastn.py --n 1,10,100,1000 --repeat 20
+
+Para cada N reporta p50/p95 de latência e os chunks / buffers tocados pelo plano
+(EXPLAIN ANALYZE, BUFFERS) de cada estratégia (na adaptativa, somados sobre as
+sondas que `_fetch_latest` de fato executou, com a janela escalada pela cadência).
+Grava o resultado em JSON em --out.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import psycopg2.extras
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+import crud  # noqa: E402
+from db import get_db_conn  # noqa: E402
+
+UNBOUNDED_SQL = """
+    SELECT * FROM measurements
+     WHERE bus_id = %s
+     ORDER BY timestamp DESC
+     LIMIT %s;
+"""
+
+
+def unbounded(cur, bus_id, n):
+    cur.execute(UNBOUNDED_SQL, (bus_id, n))
+    return cur.fetchall()
+
+
+def adaptive(cur, bus_id, n):
+    return crud._fetch_latest(cur, bus_id, n)
+
+
+class ProbeRecorder:
+    """Cursor que repassa tudo e guarda as sondas em measurements executadas."""
+
+    def __init__(self, cur):
+        self._cur = cur
+        self.probes = []
+
+    def execute(self, query, params=None):
+        if "FROM measurements" in query:
+            self.probes.append((query, params))
+        return self._cur.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+def adaptive_plan_stats(cur, bus_id, n):
+    """Plano das sondas que a busca adaptativa executa hoje (janela real, não a inicial)."""
+    recorder = ProbeRecorder(cur)
+    crud._fetch_latest(recorder, bus_id, n)
+    chunks, buffers = set(), 0
+    for query, params in recorder.probes:
+        stats = plan_stats(cur, query, params)
+        chunks |= stats.pop("chunks")
+        buffers += stats["buffers"]
+    return {"chunks_touched": len(chunks), "buffers": buffers, "probes": len(recorder.probes)}
+
+
+def plan_stats(cur, query, params):
+    """Chunks varridos e buffers do plano de uma consulta."""
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+    plan = cur.fetchone()[0][0]["Plan"]
+    chunks = set()
+
+    def walk(node):
+        rel = node.get("Relation Name", "")
+        if "_hyper_" in rel and node.get("Actual Loops", 0) > 0:
+            chunks.add(rel)
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan)
+    return {
+        "chunks_touched": len(chunks),
+        "chunks": chunks,
+        "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+    }
+
+
+def timed(fn, cur, bus_id, n, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = fn(cur, bus_id, n)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "rows": len(rows),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[int(0.95 * (len(samples) - 1))], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark unbounded vs adaptive last-N lookups")
+    parser.add_argument("--n", default="1,10,100,1000")
+    parser.add_argument("--buses", default="", help="comma separated bus numbers (default: all)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"))
+    args = parser.parse_args()
+
+    conn = get_db_conn()
+    conn.autocommit = True
+    with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+        if args.buses:
+            buses = [int(b) for b in args.buses.split(",")]
+        else:
+            cur.execute("SELECT bus_number FROM buses ORDER BY bus_number;")
+            buses = [r[0] for r in cur.fetchall()]
+        cur.execute("""
+            SELECT count(*), count(*) FILTER (WHERE is_compressed), min(range_start), max(range_end)
+              FROM timescaledb_information.chunks WHERE hypertable_name = 'measurements';
+        """)
+        n_chunks, n_compressed, oldest, newest = cur.fetchone()
+        print(f"[bench_lastn] {n_chunks} chunks ({n_compressed} compressed), {oldest} -> {newest}")
+
+        report = {
+            "meta": {
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "chunks": n_chunks, "compressed_chunks": n_compressed,
+                "buses": buses, "repeat": args.repeat,
+            },
+            "results": [],
+        }
+        for n in [int(x) for x in args.n.split(",")]:
+            for name, fn in (("unbounded", unbounded), ("adaptive", adaptive)):
+                per_bus = [timed(fn, cur, b, n, args.repeat) for b in buses]
+                entry = {
+                    "n": n, "strategy": name,
+                    "p50_ms": round(statistics.median(r["p50_ms"] for r in per_bus), 3),
+                    "p95_ms": round(max(r["p95_ms"] for r in per_bus), 3),
+                }
+                # plano do primeiro barramento com dados (barramentos vazios não têm último timestamp)
+                plan_bus = next((b for b in buses if crud._latest_ts.get(b) is not None), None)
+                if plan_bus is None:
+                    entry.update({"chunks_touched": None, "buffers": None})
+                elif name == "unbounded":
+                    stats = plan_stats(cur, UNBOUNDED_SQL, (plan_bus, n))
+                    stats.pop("chunks")
+                    entry.update(stats, plan_bus=plan_bus)
+                else:
+                    entry.update(adaptive_plan_stats(cur, plan_bus, n), plan_bus=plan_bus)
+                report["results"].append(entry)
+                print(f"[bench_lastn] n={n:<5} {name:<10} p50={entry['p50_ms']}ms p95={entry['p95_ms']}ms "
+                      f"chunks={entry['chunks_touched']} buffers={entry['buffers']}")
+    conn.close()
+
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"lastn_{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"[bench_lastn] results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
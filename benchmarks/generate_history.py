@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Gerador vetorizado de histórico sintético para a tabela measurements.
+
+Sintetiza dados trifásicos realistas com NumPy (curva de carga diária, P/Q/S e
+fator de potência correlacionados, afundamentos de tensão injetados) e grava
+direto no Postgres via `COPY ... FROM STDIN (FORMAT binary)`, em paralelo por
+barramento x fatia de tempo.
+
+Uso:
+    python generate_history.py --days 90 --interval 5 --workers 8
+    python generate_history.py --start 2024-01-01 --end 2025-01-01 --buses 1,2,3
+
+O intervalo alvo deve estar vazio: o COPY falha em conflito de PK (bus_id, timestamp).
+Use `--clear` para apagar antes as medições dos barramentos no intervalo.
+"""
+import argparse
+import io
+import os
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+from multiprocessing import Pool
+
+import numpy as np
+import psycopg2
+
+DB_HOST = os.environ.get("DB_HOST", "localhost")
+DB_PORT = int(os.environ.get("DB_PORT", 5432))
+DB_NAME = os.environ.get("DB_NAME", "labrei_microgrid")
+DB_USER = os.environ.get("DB_USER", "labrei_admin")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "YOUR_STRONG_PASSWORD")
+
+# Mesma ordem da tabela/`Measurement` (backend/models.py)
+CHANNELS = (
+    "freq_a", "freq_b", "freq_c",
+    "va_rms", "vb_rms", "vc_rms",
+    "ia_rms", "ib_rms", "ic_rms",
+    "pa", "pb", "pc",
+    "sa", "sb", "sc",
+    "qa", "qb", "qc",
+    "pfa", "pfb", "pfc",
+    "va_p", "vb_p", "vc_p",
+    "va_th", "vb_th", "vc_th",
+    "ia_p", "ib_p", "ic_p",
+    "ia_th", "ib_th", "ic_th",
+)
+COLUMNS = ("bus_id", "timestamp") + CHANNELS
+
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
+# ~290 B por linha e umas 3-4 cópias vivas por lote (linhas, tobytes, payload,
+# arrays gerados): 100k linhas ≈ 100 MB por worker
+MAX_ROWS_PER_COPY = 100_000
+
+# Layout binário de uma linha do COPY: nº de campos + (tamanho, valor) por coluna
+ROW_DTYPE = np.dtype(
+    [("nfields", ">i2"), ("bus_len", ">i4"), ("bus_id", ">i4"), ("ts_len", ">i4"), ("ts", ">i8")]
+    + [f for c in CHANNELS for f in ((f"{c}_len", ">i4"), (c, ">i4"))]
+)
+
+
+def get_db_conn():
+    return psycopg2.connect(
+        host=DB_HOST, port=DB_PORT, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD
+    )
+
+
+# ————— Síntese —————
+
+def daily_load_curve(hours: np.ndarray) -> np.ndarray:
+    """Curva de carga em p.u. (0..1): base noturna, pico da manhã e pico do fim da tarde."""
+    morning = 0.35 * np.exp(-0.5 * ((hours - 10.0) / 2.0) ** 2)
+    evening = 0.55 * np.exp(-0.5 * ((hours - 18.5) / 1.8) ** 2)
+    return 0.25 + morning + evening
+
+
+def synthesize(bus_id: int, nominal_v: float, nominal_i: float, t0_us: int, n: int,
+               interval_s: float, freq_hz: float, sag_rate: float, rng: np.random.Generator):
+    """Gera `n` amostras de um barramento a partir de `t0_us` (µs desde a época Unix)."""
+    ts_us = t0_us + (np.arange(n, dtype=np.int64) * int(interval_s * 1_000_000))
+    hours = (ts_us / 3.6e9) % 24.0
+    weekday = ((ts_us // 86_400_000_000) + 3) % 7          # 0 = segunda
+    weekend = np.where(weekday >= 5, 0.6, 1.0)
+
+    # carga lentamente variável (passeio aleatório suavizado) sobre a curva diária
+    drift = np.cumsum(rng.normal(0.0, 0.002, n))
+    drift -= np.linspace(0.0, drift[-1], n)
+    load = np.clip(daily_load_curve(hours) * weekend + drift + rng.normal(0, 0.02, n), 0.02, 1.1)
+
+    # desequilíbrio fixo por fase + ruído
+    phase_share = np.array([1.0, 0.93, 1.07])[:, None] + rng.normal(0, 0.01, (3, n))
+    i_rms = nominal_i * load[None, :] * phase_share
+
+    # tensão cai com a carga (impedância da rede) + ruído; afundamentos injetados
+    v_rms = nominal_v * (1.02 - 0.04 * load[None, :] + rng.normal(0, 0.003, (3, n)))
+    n_sags = rng.poisson(sag_rate * n * interval_s / 86400.0)
+    for _ in range(n_sags):
+        start = rng.integers(0, n)
+        length = max(1, int(rng.uniform(0.5, 30.0) / interval_s))
+        depth = rng.uniform(0.5, 0.9)
+        phases = rng.choice(3, size=rng.integers(1, 4), replace=False)
+        v_rms[phases, start:start + length] *= depth
+
+    # fator de potência correlacionado com a carga (carga leve -> FP menor)
+    pf = np.clip(0.86 + 0.12 * load[None, :] + rng.normal(0, 0.01, (3, n)), 0.70, 1.0)
+    phi = np.arccos(pf)
+    s = v_rms * i_rms
+    p = s * pf
+    q = s * np.sin(phi)
+
+    freq = freq_hz + np.clip(np.cumsum(rng.normal(0, 0.002, n)), -0.2, 0.2)
+
+    v_th = np.array([0.0, 240.0, 120.0])[:, None] * np.ones((1, n))
+    i_th = (v_th - np.degrees(phi)) % 360.0
+
+    cols = {
+        "freq": np.repeat(freq[None, :], 3, axis=0),
+        "v_rms": v_rms, "i_rms": i_rms, "p": p, "s": s, "q": q, "pf": pf * 1000.0,
+        "v_p": v_rms * np.sqrt(2.0), "v_th": v_th, "i_p": i_rms * np.sqrt(2.0), "i_th": i_th,
+    }
+    return ts_us, {k: np.rint(v).astype(np.int32) for k, v in cols.items()}
+
+
+def to_copy_binary(bus_id: int, ts_us: np.ndarray, cols) -> bytes:
+    """Monta o payload do COPY binário inteiro com operações vetorizadas."""
+    n = ts_us.shape[0]
+    rows = np.empty(n, dtype=ROW_DTYPE)
+    rows["nfields"] = len(COLUMNS)
+    rows["bus_len"] = 4
+    rows["bus_id"] = bus_id
+    rows["ts_len"] = 8
+    rows["ts"] = ts_us - int(PG_EPOCH.timestamp()) * 1_000_000
+    groups = (
+        ("freq", "freq_{}"), ("v_rms", "v{}_rms"), ("i_rms", "i{}_rms"),
+        ("p", "p{}"), ("s", "s{}"), ("q", "q{}"), ("pf", "pf{}"),
+        ("v_p", "v{}_p"), ("v_th", "v{}_th"), ("i_p", "i{}_p"), ("i_th", "i{}_th"),
+    )
+    for key, pattern in groups:
+        for k, phase in enumerate("abc"):
+            name = pattern.format(phase)
+            rows[f"{name}_len"] = 4
+            rows[name] = cols[key][k]
+    return COPY_HEADER + rows.tobytes() + COPY_TRAILER
+
+
+# ————— Carga no banco —————
+
+def load_task(task):
+    """Worker: gera e copia uma fatia (barramento, intervalo) em lotes de até MAX_ROWS_PER_COPY."""
+    bus_id, nominal_v, nominal_i, t0_us, t1_us, opts = task
+    rng = np.random.default_rng([opts["seed"], bus_id, t0_us // 1_000_000])
+    step_us = int(opts["interval"] * 1_000_000)
+    total = 0
+    conn = get_db_conn()
+    try:
+        with conn.cursor() as cur:
+            if opts["clear"]:
+                cur.execute(
+                    "DELETE FROM measurements WHERE bus_id = %s AND timestamp >= %s AND timestamp < %s;",
+                    (bus_id, _to_dt(t0_us), _to_dt(t1_us))
+                )
+            start = t0_us
+            while start < t1_us:
+                n = min(MAX_ROWS_PER_COPY, -(-(t1_us - start) // step_us))
+                ts_us, cols = synthesize(
+                    bus_id, nominal_v, nominal_i, start, n, opts["interval"],
+                    opts["freq"], opts["sag_rate"], rng
+                )
+                cur.copy_expert(
+                    f"COPY measurements ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT binary);",
+                    io.BytesIO(to_copy_binary(bus_id, ts_us, cols))
+                )
+                total += n
+                start += n * step_us
+        conn.commit()
+    finally:
+        conn.close()
+    return bus_id, total
+
+
+def _to_dt(us: int) -> datetime:
+    return datetime.fromtimestamp(us / 1_000_000, tz=timezone.utc)
+
+
+def fetch_buses(selected):
+    conn = get_db_conn()
+    with conn.cursor() as cur:
+        cur.execute("SELECT bus_number, nominal_voltage, nominal_current FROM buses ORDER BY bus_number;")
+        rows = cur.fetchall()
+    conn.close()
+    if selected:
+        rows = [r for r in rows if r[0] in selected]
+    return [(b, v or 220.0, i or 50.0) for b, v, i in rows]
+
+
+def parse_time(text: str) -> datetime:
+    dt = datetime.fromisoformat(text)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed measurements with synthetic three-phase history")
+    parser.add_argument("--days", type=float, default=30, help="history length ending at --end")
+    parser.add_argument("--start", type=parse_time, help="ISO start (overrides --days)")
+    parser.add_argument("--end", type=parse_time, help="ISO end (default: now)")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between samples")
+    parser.add_argument("--buses", default="", help="comma separated bus numbers (default: all)")
+    parser.add_argument("--slice-days", type=float, default=7, help="time slice per worker task")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--freq", type=float, default=60.0, help="nominal frequency (Hz)")
+    parser.add_argument("--sag-rate", type=float, default=2.0, help="mean voltage sags per bus per day")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--clear", action="store_true", help="delete existing rows in the range first")
+    args = parser.parse_args()
+
+    end = args.end or datetime.now(timezone.utc).replace(microsecond=0)
+    start = args.start or end - timedelta(days=args.days)
+    selected = {int(b) for b in args.buses.split(",") if b}
+    buses = fetch_buses(selected)
+    if not buses:
+        raise SystemExit("No buses found")
+
+    opts = {"interval": args.interval, "freq": args.freq, "sag_rate": args.sag_rate,
+            "seed": args.seed, "clear": args.clear}
+    step_us = int(args.interval * 1_000_000)
+    # ao menos uma amostra por fatia (slice_days muito pequeno daria passo 0)
+    slice_us = max(1, int(args.slice_days * 86400 * 1_000_000) // step_us) * step_us
+    t_start, t_end = int(start.timestamp() * 1_000_000), int(end.timestamp() * 1_000_000)
+    tasks = [
+        (bus, v, i, t0, min(t0 + slice_us, t_end), opts)
+        for bus, v, i in buses
+        for t0 in range(t_start, t_end, slice_us)
+    ]
+
+    print(f"[generate] {len(buses)} buses, {start.isoformat()} -> {end.isoformat()}, "
+          f"interval={args.interval}s, {len(tasks)} tasks on {args.workers} workers")
+    t0 = time.perf_counter()
+    total = 0
+    with Pool(args.workers) as pool:
+        for bus_id, n in pool.imap_unordered(load_task, tasks):
+            total += n
+            elapsed = time.perf_counter() - t0
+            print(f"[generate] bus {bus_id}: +{n} rows (total {total}, {total / elapsed * 60:,.0f} rows/min)")
+    elapsed = time.perf_counter() - t0
+    print(f"[generate] done: {total} rows in {elapsed:.1f}s ({total / elapsed * 60:,.0f} rows/min)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Backfill paralelo de exportações históricas (CSV ou Parquet) na tabela measurements.
+
+Os arquivos são lidos de forma preguiçosa, em lotes de --batch-rows linhas
+(CSV com o módulo csv; Parquet com pyarrow, se instalado). As colunas são
+mapeadas para os campos de `Measurement`, e cada lote vai para um worker que faz
+`COPY` numa tabela temporária e depois um `INSERT ... SELECT` em measurements com
+`ON CONFLICT (bus_id, timestamp)`: DO NOTHING (--on-conflict skip, padrão) ou
+DO UPDATE (--on-conflict update). Assim lotes repetidos ou sobrepostos são seguros.
+
+Cada lote é uma fatia contígua de tempo de um arquivo, e as exportações costumam
+ser por medidor. Por isso o trabalho fica naturalmente dividido por barramento
+(arquivo) e por tempo (lote). Cada lote é ordenado por (bus_id, timestamp) antes
+da carga, o que mantém consistente a ordem dos locks entre workers.
+
+O progresso fica em --checkpoint (JSON): lotes concluídos de cada arquivo, junto
+com o tamanho e o mtime do arquivo. Ao rodar de novo, os lotes já carregados são
+pulados, e um arquivo alterado é recarregado do início. Ao final, com --compress,
+os chunks tocados que já passaram de COMPRESS_AFTER_HOURS são comprimidos. Por
+fim, o cache de resultados do backend (--api-url, padrão $API_URL) é invalidado
+para as janelas carregadas; --api-url "" desliga, e aí é preciso chamar
+POST /cache/invalidate manualmente.
+
+Uso:
+    python backfill.py exports/*.csv --map "Timestamp=timestamp,Va=va_rms,Vb=vb_rms" --bus-id 3
+    python backfill.py meter_*.parquet --map-file mapping.json --workers 8 --on-conflict update \\
+        --compress --api-url http://localhost:8000
+
+Colunas não mapeadas explicitamente são usadas se já tiverem o nome de um campo.
+Timestamps: ISO8601 ou epoch (s ou ms); sem fuso, assume --tz (padrão UTC).
+"""
+import argparse
+import csv
+import glob
+import io
+import json
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from multiprocessing import Pool
+from zoneinfo import ZoneInfo
+
+import psycopg2
+import psycopg2.errors
+
+DB_HOST = os.environ.get("DB_HOST", "localhost")
+DB_PORT = int(os.environ.get("DB_PORT", 5432))
+DB_NAME = os.environ.get("DB_NAME", "labrei_microgrid")
+DB_USER = os.environ.get("DB_USER", "labrei_admin")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "YOUR_STRONG_PASSWORD")
+COMPRESS_AFTER_HOURS = int(os.environ.get("COMPRESS_AFTER_HOURS", 24))
+API_URL = os.environ.get("API_URL", "http://localhost:8000")
+
+# Mesma ordem da tabela/`Measurement` (backend/models.py)
+CHANNELS = (
+    "freq_a", "freq_b", "freq_c",
+    "va_rms", "vb_rms", "vc_rms",
+    "ia_rms", "ib_rms", "ic_rms",
+    "pa", "pb", "pc",
+    "sa", "sb", "sc",
+    "qa", "qb", "qc",
+    "pfa", "pfb", "pfc",
+    "va_p", "vb_p", "vc_p",
+    "va_th", "vb_th", "vc_th",
+    "ia_p", "ib_p", "ic_p",
+    "ia_th", "ib_th", "ic_th",
+)
+COLUMNS = ("bus_id", "timestamp") + CHANNELS
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def get_db_conn():
+    return psycopg2.connect(
+        host=DB_HOST, port=DB_PORT, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD
+    )
+
+
+# ———— leitura ————
+
+def read_batches(path: str, batch_rows: int):
+    """Gera lotes (listas de dicts coluna -> valor) sem carregar o arquivo inteiro."""
+    if path.lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet input requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows):
+            yield batch.to_pylist()
+        return
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        batch = []
+        for row in csv.DictReader(f):
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def build_mapping(spec: str, spec_file: str) -> dict:
+    """Mapa coluna do arquivo -> campo de Measurement."""
+    mapping = {}
+    if spec_file:
+        with open(spec_file, encoding="utf-8") as f:
+            mapping.update(json.load(f))
+    for pair in filter(None, (p.strip() for p in spec.split(","))):
+        src, _, dst = pair.partition("=")
+        mapping[src.strip()] = dst.strip()
+    unknown = set(mapping.values()) - set(COLUMNS)
+    if unknown:
+        raise SystemExit(f"Unknown target fields in mapping: {sorted(unknown)}")
+    return mapping
+
+
+# ———— conversão (no worker) ————
+
+def _timestamp(value, tz) -> datetime:
+    if isinstance(value, datetime):
+        ts = value
+    elif isinstance(value, (int, float)) or str(value).replace(".", "", 1).isdigit():
+        seconds = float(value)
+        if seconds > 1e11:  # epoch em milissegundos
+            seconds /= 1000
+        return _EPOCH + timedelta(seconds=seconds)
+    else:
+        ts = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=tz)
+
+
+def _int(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return value
+    return int(round(float(value)))
+
+
+def convert(rows, mapping: dict, bus_id, tz) -> list:
+    """Linhas brutas -> tuplas na ordem de COLUMNS, ordenadas por (bus_id, timestamp)."""
+    out = []
+    for raw in rows:
+        rec = {}
+        for src, value in raw.items():
+            dst = mapping.get(src, src if src in COLUMNS else None)
+            if dst is not None:
+                rec[dst] = value
+        if bus_id is not None:
+            rec["bus_id"] = bus_id
+        if rec.get("bus_id") in (None, "") or rec.get("timestamp") in (None, ""):
+            raise ValueError(f"row without bus_id/timestamp: {raw}")
+        out.append((
+            _int(rec["bus_id"]), _timestamp(rec["timestamp"], tz),
+            *(_int(rec.get(c)) for c in CHANNELS)
+        ))
+    out.sort(key=lambda r: (r[0], r[1]))
+    return out
+
+
+# ———— carga (no worker) ————
+
+_worker = {}
+
+def init_worker(opts):
+    conn = get_db_conn()
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE backfill_stage
+              (LIKE measurements INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+        """)
+    conn.commit()
+    _worker.update(opts, conn=conn, tz=ZoneInfo(opts["tz"]))
+
+
+def load_batch(task):
+    """Worker: converte um lote, COPY na tabela temporária e INSERT ... ON CONFLICT."""
+    path, index, rows = task
+    records = convert(rows, _worker["mapping"], _worker["bus_id"], _worker["tz"])
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for r in records:
+        writer.writerow(("" if v is None else v.isoformat() if isinstance(v, datetime) else v) for v in r)
+    buf.seek(0)
+
+    if _worker["on_conflict"] == "update":
+        action = "DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in CHANNELS)
+    else:
+        action = "DO NOTHING"
+    conn = _worker["conn"]
+    for attempt in range(3):
+        try:
+            with conn.cursor() as cur:
+                cur.copy_expert(
+                    f"COPY backfill_stage ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv);", buf
+                )
+                # DISTINCT ON: duplicata dentro do próprio lote não pode bater duas vezes na mesma linha
+                cur.execute(f"""
+                    INSERT INTO measurements ({', '.join(COLUMNS)})
+                    SELECT DISTINCT ON (bus_id, timestamp) {', '.join(COLUMNS)}
+                      FROM backfill_stage
+                     ORDER BY bus_id, timestamp
+                    ON CONFLICT (bus_id, timestamp) {action};
+                """)
+                inserted = cur.rowcount
+            conn.commit()
+            break
+        except psycopg2.errors.DeadlockDetected:
+            conn.rollback()
+            buf.seek(0)
+            if attempt == 2:
+                raise
+            time.sleep(0.5 * (attempt + 1))
+
+    spans = {}
+    for bus_id, ts, *_ in records:
+        lo, hi = spans.get(bus_id, (ts, ts))
+        spans[bus_id] = (min(lo, ts), max(hi, ts))
+    return path, index, len(records), inserted, spans
+
+
+# ———— checkpoint ————
+
+class Checkpoint:
+    """Lotes concluídos por arquivo; gravado atomicamente a cada lote."""
+
+    def __init__(self, path: str, batch_rows: int):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.state = {"files": {}}
+        self._lock = threading.Lock()  # o gerador de lotes roda na thread do Pool
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def _fingerprint(self, file: str) -> str:
+        st = os.stat(file)
+        return f"{st.st_size}:{int(st.st_mtime)}:{self.batch_rows}"
+
+    def entry(self, file: str) -> dict:
+        fp = self._fingerprint(file)
+        with self._lock:
+            entry = self.state["files"].get(file)
+            if entry is None or entry["fingerprint"] != fp:
+                entry = self.state["files"][file] = {"fingerprint": fp, "done": [], "complete": False}
+            return entry
+
+    def mark(self, file: str, index: int):
+        with self._lock:
+            self.state["files"][file]["done"].append(index)
+            self._save()
+
+    def complete(self, file: str):
+        with self._lock:
+            self.state["files"][file]["complete"] = True
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+
+# ———— pós-carga ————
+
+def compress_loaded(lo: datetime, hi: datetime) -> int:
+    """Comprime os chunks não comprimidos tocados pela carga que já estão frios."""
+    conn = get_db_conn()
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT format('%%I.%%I', chunk_schema, chunk_name)
+              FROM timescaledb_information.chunks
+             WHERE hypertable_name = 'measurements'
+               AND NOT is_compressed
+               AND range_start <= %s AND range_end > %s
+               AND range_end <= now() - make_interval(hours => %s);
+        """, (hi, lo, COMPRESS_AFTER_HOURS))
+        chunks = [r[0] for r in cur.fetchall()]
+        for chunk in chunks:
+            cur.execute("SELECT compress_chunk(%s::regclass, if_not_compressed => TRUE);", (chunk,))
+    conn.close()
+    return len(chunks)
+
+
+def invalidate_cache(api_url: str, spans: dict):
+    for bus_id, (lo, hi) in sorted(spans.items()):
+        query = urllib.parse.urlencode({"bus_id": bus_id, "start": lo.isoformat(), "end": hi.isoformat()})
+        req = urllib.request.Request(f"{api_url.rstrip('/')}/cache/invalidate?{query}", method="POST")
+        try:
+            with urllib.request.urlopen(req, timeout=10) as resp:
+                print(f"[backfill] cache invalidated for bus {bus_id}: {resp.read().decode()}")
+        except OSError as e:
+            print(f"[backfill] cache invalidation failed for bus {bus_id}: {e}")
+
+
+# ———— main ————
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill measurements from CSV/Parquet exports")
+    parser.add_argument("files", nargs="+", help="input files or glob patterns (.csv, .parquet)")
+    parser.add_argument("--map", default="", help='column mapping "src=field,src2=field2"')
+    parser.add_argument("--map-file", default="", help="JSON file with {source column: field}")
+    parser.add_argument("--bus-id", type=int, help="bus number for files without a bus column")
+    parser.add_argument("--tz", default="UTC", help="timezone of naive timestamps")
+    parser.add_argument("--batch-rows", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--on-conflict", choices=("skip", "update"), default="skip")
+    parser.add_argument("--checkpoint", default=".backfill_checkpoint.json", help='"" disables')
+    parser.add_argument("--compress", action="store_true", help="compress cold chunks after loading")
+    parser.add_argument("--api-url", default=API_URL, help='backend URL to invalidate cached results ("" disables)')
+    args = parser.parse_args()
+
+    files = sorted({p for pattern in args.files for p in (glob.glob(pattern) or [pattern])})
+    missing = [p for p in files if not os.path.isfile(p)]
+    if missing:
+        raise SystemExit(f"Files not found: {missing}")
+    mapping = build_mapping(args.map, args.map_file)
+    checkpoint = Checkpoint(args.checkpoint, args.batch_rows)
+
+    # no máximo 2 lotes por worker em memória: o Pool consumiria o gerador inteiro
+    slots = threading.BoundedSemaphore(args.workers * 2)
+    batches_per_file = {}
+
+    def tasks():
+        for path in files:
+            entry = checkpoint.entry(path)
+            if entry["complete"]:
+                print(f"[backfill] {path}: already loaded, skipping")
+                continue
+            done = set(entry["done"])
+            count = 0
+            for index, rows in enumerate(read_batches(path, args.batch_rows)):
+                count += 1
+                if index in done:
+                    continue
+                slots.acquire()
+                yield path, index, rows
+            batches_per_file[path] = count
+
+    opts = {"mapping": mapping, "bus_id": args.bus_id, "tz": args.tz, "on_conflict": args.on_conflict}
+    print(f"[backfill] {len(files)} files, batches of {args.batch_rows} rows on {args.workers} workers "
+          f"(on conflict: {args.on_conflict})")
+    t0 = time.perf_counter()
+    total = inserted_total = 0
+    spans = {}
+    with Pool(args.workers, initializer=init_worker, initargs=(opts,)) as pool:
+        for path, index, n, inserted, batch_spans in pool.imap_unordered(load_batch, tasks()):
+            slots.release()
+            checkpoint.mark(path, index)
+            total += n
+            inserted_total += inserted
+            for bus_id, (lo, hi) in batch_spans.items():
+                old = spans.get(bus_id, (lo, hi))
+                spans[bus_id] = (min(old[0], lo), max(old[1], hi))
+            entry = checkpoint.state["files"][path]
+            if len(entry["done"]) == batches_per_file.get(path):
+                checkpoint.complete(path)
+            elapsed = time.perf_counter() - t0
+            print(f"[backfill] {path} batch {index}: {n} rows, {inserted} written "
+                  f"(total {total}, {total / elapsed * 60:,.0f} rows/min)")
+    # arquivos cujos lotes terminaram antes do gerador contar o total
+    for path, count in batches_per_file.items():
+        entry = checkpoint.state["files"][path]
+        if not entry["complete"] and len(entry["done"]) == count:
+            checkpoint.complete(path)
+
+    elapsed = time.perf_counter() - t0
+    print(f"[backfill] done: {total} rows read, {inserted_total} written in {elapsed:.1f}s")
+    if not spans:
+        return
+    if args.compress:
+        lo = min(s[0] for s in spans.values())
+        hi = max(s[1] for s in spans.values())
+        print(f"[backfill] compressed {compress_loaded(lo, hi)} chunks")
+    if args.api_url:
+        invalidate_cache(args.api_url, spans)
+
+
+if __name__ == "__main__":
+    main()
@@ -26,7 +26,10 @@ conn_info = {
 def apply_policies():
     with psycopg2.connect(**conn_info) as conn:
         with conn.cursor() as cur:
-            # drop_chunks: primeiro o regclass da tabela, depois o intervalo
+            # drop_chunks: primeiro o regclass da tabela, depois o intervalo.
+            # Os agregados contínuos (measurements_samples_1h, measurements_stats_1h)
+            # não são rematerializados aqui de propósito: drop_chunks não os
+            # invalida, e assim o histórico horário sobrevive aos dados brutos.
             cur.execute(f"""
                 SELECT drop_chunks(
                   'measurements'::regclass,
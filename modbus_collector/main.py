@@ -1,11 +1,16 @@
 import os
 import time
-import schedule
+import socket
 import psycopg2
-import json
-from pymodbus.client.sync import ModbusTcpClient
+import psycopg2.extras
+from concurrent.futures import ThreadPoolExecutor, wait
+from pymodbus.client import ModbusTcpClient
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timezone
+
+from sharding import ShardCoordinator
+from scheduler import FixedRateScheduler
+from metrics import Metrics
 
 load_dotenv()  # Carrega as variáveis do .env, se existir
 
@@ -15,9 +20,32 @@ DB_NAME = os.environ.get("DB_NAME", "labrei_microgrid")
 DB_USER = os.environ.get("DB_USER", "labrei_admin")
 DB_PASSWORD = os.environ.get("DB_PASSWORD", "YOUR_STRONG_PASSWORD")
 
+# Padrão para barramentos sem extra_parameters.modbus
 MODBUS_HOST = os.environ.get("MODBUS_HOST", "192.168.0.123")
 MODBUS_PORT = int(os.environ.get("MODBUS_PORT", 502))
 
+POLL_INTERVAL = float(os.environ.get("POLL_INTERVAL", 1))     # segundos
+POLL_WORKERS = int(os.environ.get("POLL_WORKERS", 8))         # leituras simultâneas por instância
+INSTANCE_ID = os.environ.get("COLLECTOR_ID", f"{socket.gethostname()}-{os.getpid()}")
+OVERRUN_POLICY = os.environ.get("OVERRUN_POLICY", "shed")    # skip | catch_up | shed
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9101))
+
+# Mapa de registradores: 33 holding registers consecutivos (int16 com sinal),
+# na mesma ordem das colunas de measurements após bus_id/timestamp.
+CHANNELS = (
+    "freq_a", "freq_b", "freq_c",
+    "va_rms", "vb_rms", "vc_rms",
+    "ia_rms", "ib_rms", "ic_rms",
+    "pa", "pb", "pc",
+    "sa", "sb", "sc",
+    "qa", "qb", "qc",
+    "pfa", "pfb", "pfc",
+    "va_p", "vb_p", "vc_p",
+    "va_th", "vb_th", "vc_th",
+    "ia_p", "ib_p", "ic_p",
+    "ia_th", "ib_th", "ic_th",
+)
+
 def get_db_conn():
     return psycopg2.connect(
         host=DB_HOST,
@@ -27,37 +55,100 @@ def get_db_conn():
         password=DB_PASSWORD
     )
 
-def collect_modbus_data():
-    print(f"[{datetime.now()}] Connecting to Modbus at {MODBUS_HOST}:{MODBUS_PORT}...")
-    client = ModbusTcpClient(MODBUS_HOST, port=MODBUS_PORT)
-    if client.connect():
-        try:
-            # Exemplo: ler 2 registradores a partir do endereço 0 do barramento 1
-            rr = client.read_holding_registers(0, 2, unit=1)
-            if rr.isError():
-                print("Error reading Modbus registers.")
-            else:
-                value = rr.registers[0]
-                print(f"Read value: {value}")
-                # Insere no banco (ajuste conforme seu modelo de measurements)
-                conn = get_db_conn()
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO measurements (bus_id, timestamp, measurement_type, value, unit)
-                        VALUES (%s, %s, %s, %s, %s);
-                    """, (1, datetime.now(), 'voltage', value, 'V'))
-                conn.commit()
-                conn.close()
-        finally:
-            client.close()
-    else:
-        print("Could not connect to Modbus device.")
-
-# Agenda para rodar a cada 1 minuto
-schedule.every(1).minutes.do(collect_modbus_data)
+def load_devices():
+    """
+    Dispositivos = barramentos cadastrados. Endereço Modbus em
+    extra_parameters.modbus = {"host", "port", "unit", "address"}; sem isso usa
+    MODBUS_HOST/MODBUS_PORT com unit = bus_number e address = 0.
+    """
+    conn = get_db_conn()
+    with conn.cursor() as cur:
+        cur.execute("SELECT bus_number, extra_parameters FROM buses ORDER BY bus_number;")
+        rows = cur.fetchall()
+    conn.close()
+    devices = {}
+    for bus_number, extra in rows:
+        cfg = (extra or {}).get("modbus", {})
+        devices[bus_number] = {
+            "host": cfg.get("host", MODBUS_HOST),
+            "port": int(cfg.get("port", MODBUS_PORT)),
+            "unit": int(cfg.get("unit", bus_number)),
+            "address": int(cfg.get("address", 0)),
+        }
+    return devices
+
+def read_device(bus_number: int, dev: dict):
+    """Lê um dispositivo e retorna a linha de measurements, ou None em caso de erro."""
+    client = ModbusTcpClient(dev["host"], port=dev["port"])
+    if not client.connect():
+        print(f"[{datetime.now()}] Could not connect to Modbus device of bus {bus_number}.")
+        return None
+    try:
+        ts = datetime.now(timezone.utc)
+        rr = client.read_holding_registers(dev["address"], len(CHANNELS), slave=dev["unit"])
+        if rr.isError():
+            print(f"[{datetime.now()}] Error reading Modbus registers of bus {bus_number}.")
+            return None
+        values = [r - 0x10000 if r & 0x8000 else r for r in rr.registers]
+        return (bus_number, ts, *values)
+    finally:
+        client.close()
+
+def store(rows):
+    conn = get_db_conn()
+    with conn.cursor() as cur:
+        psycopg2.extras.execute_values(cur, f"""
+            INSERT INTO measurements (bus_id, timestamp, {', '.join(CHANNELS)})
+            VALUES %s ON CONFLICT DO NOTHING;
+        """, rows)
+    conn.commit()
+    conn.close()
+
+coordinator = ShardCoordinator(get_db_conn, INSTANCE_ID)
+pool = ThreadPoolExecutor(max_workers=POLL_WORKERS)
+metrics = Metrics("labrei_collector")
+in_flight = {}  # bus_number -> Future da leitura em andamento
+
+def timed_read(bus_number: int, dev: dict):
+    t0 = time.perf_counter()
+    row = read_device(bus_number, dev)
+    metrics.observe("device_read", (time.perf_counter() - t0) * 1000, label=str(bus_number))
+    if row is None:
+        metrics.inc("device_errors", label=str(bus_number))
+    return row
+
+def collect_modbus_data(scheduled: float, deadline: float = None):
+    devices = load_devices()
+    owned = coordinator.rebalance(devices.keys())
+    for bus in sorted(owned):
+        prev = in_flight.get(bus)
+        if prev is not None and not prev.done():
+            # leitura anterior ainda pendurada: dispositivo lento fica fora deste ciclo
+            metrics.inc("device_shed", label=str(bus))
+            continue
+        in_flight[bus] = pool.submit(timed_read, bus, devices[bus])
+    # com a política "shed" só espera até o prazo do ciclo; o resto fica para depois
+    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+    done, _ = wait(list(in_flight.values()), timeout=timeout)
+    rows = []
+    for bus, fut in list(in_flight.items()):
+        if fut in done:
+            del in_flight[bus]
+            if fut.result():
+                rows.append(fut.result())
+    if rows:
+        # leituras de dispositivos liberados enquanto estavam em andamento são descartadas
+        held = coordinator.held(r[0] for r in rows)
+        dropped = [r[0] for r in rows if r[0] not in held]
+        for bus in dropped:
+            metrics.inc("device_released_reads", label=str(bus))
+        rows = [r for r in rows if r[0] in held]
+    if rows:
+        store(rows)
+    print(f"[{datetime.now()}] {INSTANCE_ID}: stored {len(rows)} rows, "
+          f"{len(in_flight)} reads pending, devices {sorted(owned)}")
 
 if __name__ == "__main__":
-    print("Starting Modbus Collector")
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    print(f"Starting Modbus Collector {INSTANCE_ID} (interval={POLL_INTERVAL}s, overrun={OVERRUN_POLICY})")
+    metrics.serve(METRICS_PORT)
+    FixedRateScheduler(POLL_INTERVAL, OVERRUN_POLICY, metrics).run(collect_modbus_data)
@@ -0,0 +1,136 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limites superiores dos buckets em milissegundos (+Inf implícito)
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class Histogram:
+    """Histograma cumulativo de buckets fixos (em ms), com contagem, soma, mínimo e máximo."""
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value_ms: float):
+        i = 0
+        while i < len(self.buckets) and value_ms > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value_ms
+        self.min = value_ms if self.min is None else min(self.min, value_ms)
+        self.max = value_ms if self.max is None else max(self.max, value_ms)
+
+    def quantile(self, q: float):
+        """Estimativa pelo limite superior do bucket que contém o quantil."""
+        if not self.count:
+            return None
+        target = q * self.count
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= target:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum, 3),
+            "min_ms": self.min,
+            "max_ms": self.max,
+            "mean_ms": round(self.sum / self.count, 3) if self.count else None,
+            "p50_ms": self.quantile(0.50),
+            "p99_ms": self.quantile(0.99),
+            "buckets": {str(b): c for b, c in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+
+class Metrics:
+    """Registro de histogramas (com um rótulo opcional) e contadores do coletor."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}   # (nome, rótulo) -> Histogram
+        self._counters = {}     # (nome, rótulo) -> int
+
+    def observe(self, name: str, value_ms: float, label: str = None):
+        with self._lock:
+            h = self._histograms.get((name, label))
+            if h is None:
+                h = self._histograms[(name, label)] = Histogram()
+            h.observe(value_ms)
+
+    def inc(self, name: str, amount: int = 1, label: str = None):
+        with self._lock:
+            self._counters[(name, label)] = self._counters.get((name, label), 0) + amount
+
+    def to_dict(self):
+        with self._lock:
+            out = {"histograms": {}, "counters": {}}
+            for (name, label), h in sorted(self._histograms.items(), key=_sort_key):
+                out["histograms"].setdefault(name, {})[label or ""] = h.to_dict()
+            for (name, label), v in sorted(self._counters.items(), key=_sort_key):
+                out["counters"].setdefault(name, {})[label or ""] = v
+            return out
+
+    def to_prometheus(self):
+        """Formato texto do Prometheus (histogramas em segundos)."""
+        lines = []
+        with self._lock:
+            for (name, label), h in sorted(self._histograms.items(), key=_sort_key):
+                metric = f"{self.prefix}_{name}_seconds"
+                acc = 0
+                for b, c in zip(h.buckets + ("+Inf",), h.counts):
+                    acc += c
+                    le = b if b == "+Inf" else b / 1000
+                    lines.append(f'{metric}_bucket{_labels(label, le=le)} {acc}')
+                lines.append(f"{metric}_sum{_labels(label)} {h.sum / 1000}")
+                lines.append(f"{metric}_count{_labels(label)} {h.count}")
+            for (name, label), v in sorted(self._counters.items(), key=_sort_key):
+                lines.append(f"{self.prefix}_{name}_total{_labels(label)} {v}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int):
+        """Expõe /metrics (Prometheus) e /metrics.json numa thread HTTP local."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, ctype = metrics.to_prometheus().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, ctype = json.dumps(metrics.to_dict(), indent=2).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"[metrics] serving on :{port}/metrics")
+        return server
+
+
+def _labels(device, **extra):
+    pairs = ([f'device="{device}"'] if device is not None else []) + [f'{k}="{v}"' for k, v in extra.items()]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _sort_key(item):
+    (name, label), _ = item
+    return (name, "" if label is None else str(label))
@@ -0,0 +1,33 @@
+import struct
+from datetime import datetime, timedelta, timezone
+
+# Codificador do formato colunar "LRM1" aceito por POST /buses/measurements/packed
+# (ver backend/packed.py). Só usa struct: roda em hardware de laboratório sem NumPy.
+PACKED_MEDIA_TYPE = "application/vnd.labrei.measurements+packed"
+MAGIC = b"LRM1"
+HEADER = struct.Struct("<4sIH2x")
+NULL_INT32 = -2**31
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode(rows, channels) -> bytes:
+    """
+    `rows` são dicts no formato do POST JSON (bus_id, timestamp ISO8601 ou
+    datetime, canais); canais ausentes ou None viram NULL.
+    """
+    n = len(rows)
+    bus_ids = [r["bus_id"] for r in rows]
+    ts_us = [_to_us(r["timestamp"]) for r in rows]
+    out = [HEADER.pack(MAGIC, n, len(channels)), struct.pack(f"<{n}i", *bus_ids), struct.pack(f"<{n}q", *ts_us)]
+    for c in channels:
+        col = [r.get(c) for r in rows]
+        out.append(struct.pack(f"<{n}i", *(NULL_INT32 if v is None else v for v in col)))
+    return b"".join(out)
+
+
+def _to_us(ts) -> int:
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (ts - _EPOCH) // timedelta(microseconds=1)
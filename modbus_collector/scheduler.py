@@ -0,0 +1,57 @@
+import math
+import time
+
+OVERRUN_POLICIES = ("skip", "catch_up", "shed")
+
+
+class FixedRateScheduler:
+    """
+    Agendador de taxa fixa: os ciclos começam em t0 + k * interval, independente
+    de quanto o trabalho demorou (ao contrário de `sleep(interval)` após o
+    trabalho, que acumula deriva). Quando um ciclo estoura o intervalo:
+      - "skip":     pula os instantes perdidos e volta à grade no próximo;
+      - "catch_up": executa os instantes perdidos em sequência (até max_catch_up);
+      - "shed":     como "skip", e o ciclo recebe um prazo (`deadline`) para
+                    que o coletor abandone os dispositivos lentos a tempo.
+    Registra jitter de início (real - agendado), duração e estouros em `metrics`.
+    """
+
+    def __init__(self, interval: float, policy: str = "skip", metrics=None, max_catch_up: int = 10):
+        if policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy '{policy}' (valid: {', '.join(OVERRUN_POLICIES)})")
+        self.interval = interval
+        self.policy = policy
+        self.metrics = metrics
+        self.max_catch_up = max_catch_up
+
+    def run(self, tick, cycles: int = None):
+        """Chama `tick(scheduled, deadline)` (tempos de time.monotonic) a cada intervalo."""
+        next_t = time.monotonic()
+        done = 0
+        while cycles is None or done < cycles:
+            now = time.monotonic()
+            if now < next_t:
+                time.sleep(next_t - now)
+            start = time.monotonic()
+            deadline = next_t + self.interval
+            try:
+                tick(next_t, deadline if self.policy == "shed" else None)
+            except Exception as e:
+                print(f"[scheduler] cycle failed: {e}")
+            end = time.monotonic()
+            done += 1
+            if self.metrics is not None:
+                self.metrics.observe("cycle_jitter", (start - next_t) * 1000)
+                self.metrics.observe("cycle_duration", (end - start) * 1000)
+            next_t = deadline
+            if end <= next_t:
+                continue
+            # estouro: o próximo instante da grade já passou
+            late = math.ceil((end - next_t) / self.interval)
+            if self.metrics is not None:
+                self.metrics.inc("cycle_overruns")
+            if self.policy == "catch_up" and late <= self.max_catch_up:
+                continue
+            if self.metrics is not None:
+                self.metrics.inc("cycles_skipped", late)
+            next_t += late * self.interval
@@ -0,0 +1,111 @@
+import math
+import hashlib
+
+import psycopg2
+
+# Chaves (int4, int4) dos advisory locks: (namespace, bus_number) por dispositivo
+# e (namespace, pid do backend) para marcar cada instância viva do coletor.
+DEVICE_LOCK_NS = int.from_bytes(b"LRdv", "big") & 0x7FFFFFFF
+MEMBER_LOCK_NS = int.from_bytes(b"LRmb", "big") & 0x7FFFFFFF
+
+
+class ShardCoordinator:
+    """
+    Divide os dispositivos entre várias instâncias do coletor usando apenas o
+    Postgres. Cada instância mantém uma sessão dedicada onde segura:
+      - um advisory lock de "membro" (conta instâncias vivas via pg_locks);
+      - um advisory lock por dispositivo que ela sonda.
+    Locks de sessão são liberados automaticamente quando a instância morre,
+    então os sobreviventes assumem os dispositivos no próximo rebalanceamento.
+    Quando uma instância entra, as demais liberam o excedente acima da fatia
+    justa ceil(dispositivos / instâncias). Um dispositivo só é sondado por quem
+    segura seu lock, portanto nunca há sondagem dupla.
+    """
+
+    def __init__(self, connect, instance_id: str):
+        self._connect = connect
+        self.instance_id = instance_id
+        self.conn = None
+        self.owned = set()
+
+    def _session(self):
+        if self.conn is None or self.conn.closed:
+            self.owned = set()
+            self.conn = self._connect()
+            self.conn.autocommit = True
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_lock(%s, pg_backend_pid());", (MEMBER_LOCK_NS,))
+        return self.conn
+
+    def rebalance(self, devices) -> set:
+        """Ajusta o conjunto de dispositivos desta instância; retorna os que ela deve sondar."""
+        try:
+            return self._rebalance(set(devices))
+        except psycopg2.Error as e:
+            # sessão perdida => locks perdidos: para de sondar tudo até reconectar
+            print(f"[sharding] coordination session lost: {e}")
+            self.close()
+            return set()
+
+    def _rebalance(self, devices: set) -> set:
+        conn = self._session()
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT count(*) FROM pg_locks
+                 WHERE locktype = 'advisory' AND classid = %s AND objsubid = 2 AND granted;
+            """, (MEMBER_LOCK_NS,))
+            members = max(1, cur.fetchone()[0])
+            fair = math.ceil(len(devices) / members) if devices else 0
+
+            # dispositivos removidos da lista ou excedentes acima da fatia justa
+            release = self.owned - devices
+            keep = sorted(self.owned & devices, key=self._rank)
+            release |= set(keep[fair:])
+            for dev in release:
+                cur.execute("SELECT pg_advisory_unlock(%s, %s);", (DEVICE_LOCK_NS, dev))
+            self.owned -= release
+
+            # tenta assumir dispositivos livres até completar a fatia
+            for dev in sorted(devices - self.owned, key=self._rank):
+                if len(self.owned) >= fair:
+                    break
+                cur.execute("SELECT pg_try_advisory_lock(%s, %s);", (DEVICE_LOCK_NS, dev))
+                if cur.fetchone()[0]:
+                    self.owned.add(dev)
+        if release:
+            print(f"[sharding] {self.instance_id} released {sorted(release)}")
+        return set(self.owned)
+
+    def held(self, devices) -> set:
+        """
+        Dos `devices`, os cujo lock esta sessão ainda segura no banco. Leituras
+        disparadas antes de um rebalanceamento que liberou o dispositivo (ou de
+        perder a sessão) não devem ser gravadas: outro membro já o sonda.
+        """
+        if self.conn is None or self.conn.closed:
+            return set()
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT objid::int FROM pg_locks
+                     WHERE locktype = 'advisory' AND classid = %s AND objsubid = 2
+                       AND pid = pg_backend_pid() AND granted AND objid::int = ANY(%s);
+                """, (DEVICE_LOCK_NS, list(devices)))
+                return {r[0] for r in cur.fetchall()} & self.owned
+        except psycopg2.Error as e:
+            print(f"[sharding] coordination session lost: {e}")
+            self.close()
+            return set()
+
+    def _rank(self, dev) -> bytes:
+        # ordem pseudoaleatória estável por instância: espalha a disputa pelos locks
+        return hashlib.sha1(f"{self.instance_id}:{dev}".encode()).digest()
+
+    def close(self):
+        if self.conn is not None and not self.conn.closed:
+            try:
+                self.conn.close()
+            except psycopg2.Error:
+                pass
+        self.conn = None
+        self.owned = set()
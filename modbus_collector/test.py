@@ -5,10 +5,20 @@ import requests
 import random
 from datetime import datetime, timezone
 
+from scheduler import FixedRateScheduler
+from metrics import Metrics
+from packed import PACKED_MEDIA_TYPE, encode as encode_packed
+
 # Load configuration from environment
 # Deve apontar para o nome do service no Docker Compose
 API_URL       = os.environ.get("API_URL", "http://backend:8000")
-POLL_INTERVAL = int(os.environ.get("POLL_INTERVAL", 5))  # seconds
+POLL_INTERVAL = float(os.environ.get("POLL_INTERVAL", 5))  # seconds
+OVERRUN_POLICY = os.environ.get("OVERRUN_POLICY", "skip")  # skip | catch_up | shed
+METRICS_PORT  = int(os.environ.get("METRICS_PORT", 9101))
+# true: um único POST binário colunar por ciclo com todos os barramentos
+PACKED_INGEST = os.environ.get("PACKED_INGEST", "false").lower() == "true"
+
+metrics = Metrics("labrei_dummy_collector")
 
 def fetch_bus_list():
     """GET /buses -> retorna lista de bus_number"""
@@ -62,7 +72,7 @@ def make_dummy_measurement(bus_id: int):
     }
 
 def main():
-    print(f"[test.py] Dummy Modbus collector — interval={POLL_INTERVAL}s, API={API_URL}")
+    print(f"[test.py] Dummy Modbus collector — interval={POLL_INTERVAL}s, API={API_URL}, packed={PACKED_INGEST}")
     try:
         buses = fetch_bus_list()
         print(f"[test.py] Buses found: {buses}")
@@ -70,16 +80,46 @@ def main():
         print(f"[test.py] ERROR fetching buses: {e}")
         return
 
-    while True:
+    session = requests.Session()
+
+    def post_packed(scheduled, deadline=None):
+        rows = [make_dummy_measurement(bus_id) for bus_id in buses]
+        if not rows:
+            return
+        channels = list(rows[0])[2:]  # mesma ordem dos campos de Measurement
+        t0 = time.perf_counter()
+        try:
+            r = session.post(
+                f"{API_URL}/buses/measurements/packed",
+                data=encode_packed(rows, channels),
+                headers={"Content-Type": PACKED_MEDIA_TYPE},
+            )
+            r.raise_for_status()
+            print(f"[{datetime.now().isoformat()}] Posted packed batch of {len(rows)} measurements")
+        except Exception as e:
+            metrics.inc("batch_errors")
+            print(f"[{datetime.now().isoformat()}] ERROR posting packed batch: {e}")
+        metrics.observe("batch_post", (time.perf_counter() - t0) * 1000)
+
+    def post_all(scheduled, deadline=None):
         for bus_id in buses:
+            if deadline is not None and time.monotonic() >= deadline:
+                # política "shed": os barramentos restantes ficam para o próximo ciclo
+                metrics.inc("device_shed", label=str(bus_id))
+                continue
             m = make_dummy_measurement(bus_id)
+            t0 = time.perf_counter()
             try:
-                r = requests.post(f"{API_URL}/buses/{bus_id}/measurements", json=m)
+                r = session.post(f"{API_URL}/buses/{bus_id}/measurements", json=m)
                 r.raise_for_status()
                 print(f"[{datetime.now().isoformat()}] Posted measurement for bus {bus_id}")
             except Exception as e:
+                metrics.inc("device_errors", label=str(bus_id))
                 print(f"[{datetime.now().isoformat()}] ERROR posting for bus {bus_id}: {e}")
-        time.sleep(POLL_INTERVAL)
+            metrics.observe("device_post", (time.perf_counter() - t0) * 1000, label=str(bus_id))
+
+    metrics.serve(METRICS_PORT)
+    FixedRateScheduler(POLL_INTERVAL, OVERRUN_POLICY, metrics).run(post_packed if PACKED_INGEST else post_all)
 
 if __name__ == "__main__":
     main()
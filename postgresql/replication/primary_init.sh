@@ -0,0 +1,15 @@
+#!/bin/bash
+# Executado pelo entrypoint do Postgres só na criação do volume do primário.
+# Sem REPLICATION_PASSWORD nada é feito (instalação sem réplica).
+set -e
+
+if [ -z "$REPLICATION_PASSWORD" ]; then
+    echo "[replication] REPLICATION_PASSWORD not set, skipping replication role"
+    exit 0
+fi
+
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-SQL
+    CREATE ROLE replicator WITH REPLICATION LOGIN PASSWORD '$REPLICATION_PASSWORD';
+SQL
+
+echo "host replication replicator all scram-sha-256" >> "$PGDATA/pg_hba.conf"
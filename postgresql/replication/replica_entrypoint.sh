@@ -0,0 +1,27 @@
+#!/bin/bash
+# Réplica de streaming (hot standby) do serviço postgresql. Na primeira
+# subida clona o primário com pg_basebackup (-R grava primary_conninfo e
+# standby.signal); depois só inicia o Postgres em modo somente leitura.
+set -e
+
+PRIMARY_HOST="${PRIMARY_HOST:-postgres}"
+PRIMARY_PORT="${PRIMARY_PORT:-5432}"
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_isready -h "$PRIMARY_HOST" -p "$PRIMARY_PORT" -q; do
+        echo "[replica] waiting for primary $PRIMARY_HOST:$PRIMARY_PORT"
+        sleep 2
+    done
+    mkdir -p "$PGDATA"
+    chown postgres:postgres "$PGDATA"
+    chmod 0700 "$PGDATA"
+    su-exec postgres env PGPASSWORD="$REPLICATION_PASSWORD" pg_basebackup \
+        -h "$PRIMARY_HOST" -p "$PRIMARY_PORT" -U replicator \
+        -D "$PGDATA" -R -X stream -P
+fi
+
+# hot_standby_feedback evita que o replay cancele consultas analíticas longas
+exec su-exec postgres postgres \
+    -c hot_standby=on \
+    -c hot_standby_feedback=on \
+    -c max_standby_streaming_delay=30s